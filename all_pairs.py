@@ -0,0 +1,88 @@
+"""
+Precomputed all-pairs similarity table for Semantic Search Party
+
+The secret word always comes from cleaned_word_list.txt, so every similarity table start_round can
+ever need is known ahead of time. This script computes the whole vocabulary x vocabulary cosine
+matrix once and saves it as a float16 .npy file, with the row blocks split across a process pool.
+
+The game opens the file with np.load(mmap_mode="r") and uses the secret word's row as the round's
+table, so starting a round only pages in one row, and several game processes on the same computer
+share the same page cache.
+
+Build it with: python all_pairs.py [number of worker processes]
+"""
+
+
+import os
+import sys
+import numpy as np
+
+ALL_PAIRS_FILE = "all_pairs.npy"
+BLOCK_ROWS = 256        # rows of the table computed by one task
+
+
+# every worker keeps its own reference to the matrix and the output file path
+worker_state = {}
+
+def init_worker(matrix, path):
+    worker_state["matrix"] = matrix
+    worker_state["path"] = path
+
+# computing one block of rows and writing it straight into the shared .npy file
+def fill_block(start):
+    matrix = worker_state["matrix"]
+    stop = min(start + BLOCK_ROWS, len(matrix))
+    table = np.load(worker_state["path"], mmap_mode="r+")
+    table[start:stop] = (matrix[start:stop] @ matrix.T).astype(np.float16)
+    table.flush()
+    del table
+    return stop - start
+
+# the words file is saved next to the table so a table built from a different word list is never used
+def words_file(path):
+    return os.path.splitext(path)[0] + "_words.txt"
+
+# builds the full table from the normalized embedding matrix (rows in the same order as words)
+# (the process pool is imported here so loading the table doesn't import multiprocessing)
+def build_all_pairs(matrix, words, path=ALL_PAIRS_FILE, workers=None):
+    from concurrent.futures import ProcessPoolExecutor
+
+    table = np.lib.format.open_memmap(path, mode="w+", dtype=np.float16, shape=(len(matrix), len(matrix)))
+    del table
+
+    starts = range(0, len(matrix), BLOCK_ROWS)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(matrix, path)) as pool:
+        done = sum(pool.map(fill_block, starts))
+
+    with open(words_file(path), "w") as saved_words:
+        for word in words:
+            saved_words.write(f"{word}\n")
+    return done
+
+# memory-maps the table read-only, or returns None if it hasn't been built for this word list
+def load_all_pairs(path, words):
+    if not os.path.exists(path) or not os.path.exists(words_file(path)):
+        return None
+
+    with open(words_file(path), "r") as saved_words:
+        saved = [line.strip() for line in saved_words]
+    if saved != list(words):
+        print(f"{path} was built from a different word list, rebuild it with: python all_pairs.py")
+        return None
+
+    table = np.load(path, mmap_mode="r")
+    if table.shape != (len(words), len(words)):
+        return None
+    return table
+
+
+if __name__ == "__main__":
+    import en_core_web_lg
+    from game import read_words
+    from embeddings import UNUSED_PIPES, build_matrix
+
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    nlp = en_core_web_lg.load(exclude=UNUSED_PIPES)
+    words_only = read_words()
+    rows = build_all_pairs(build_matrix(words_only, nlp), words_only, ALL_PAIRS_FILE, workers)
+    print(f"Wrote {rows} x {len(words_only)} similarity table to {ALL_PAIRS_FILE}")
@@ -0,0 +1,211 @@
+"""
+Approximate nearest-neighbour index for Semantic Search Party
+
+Hints need "a word whose similarity to the secret word is between lo and hi". With a few thousand words
+the round's table answers that, but scoring a 300k-word hint vocabulary for every round is too slow.
+This is an IVF (inverted file) index in plain NumPy:
+    - spherical k-means splits the word vectors into about 2 * sqrt(N) clusters
+    - each cluster keeps its member rows and their vectors next to each other (so scoring a cluster
+      is one matrix-vector product on a slice, not a gather), and the largest angle between its
+      centroid and a member
+    - a query compares the secret word with the centroids only, skips the clusters that can't hold
+      a word in the band (by the angle bound), and scores the members of the nprobe most promising ones
+nprobe trades speed for recall; recall() measures it against the exact scan.
+The copy of the vectors in cluster order costs as much memory as the store's matrix.
+
+The index is built once and saved next to the bundle, with a checksum of the words it was built on.
+The game uses it for hints when it exists and the checksum matches the store's words (see game.load_resources).
+
+Build it with: python ann.py build
+Check recall with: python ann.py recall [nprobe]
+"""
+
+
+import os
+import sys
+import time
+import numpy as np
+
+ANN_FILE = "ann_index.npz"
+DEFAULT_NPROBE = 8          # clusters scored per query
+TRAIN_SAMPLE = 50000        # rows used to train the centroids
+KMEANS_ITERATIONS = 12
+CHUNK_ROWS = 8192           # rows compared with the centroids at once (keeps the similarity matrix small)
+
+
+# index of the nearest centroid for every row, done in chunks
+def nearest_centroid(vectors, centroids):
+    assign = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), CHUNK_ROWS):
+        assign[start:start + CHUNK_ROWS] = np.argmax(vectors[start:start + CHUNK_ROWS] @ centroids.T, axis=1)
+    return assign
+
+# sum of the rows in each cluster (sorting by cluster and adding up each run of rows)
+def cluster_sums(vectors, assign, num_clusters):
+    order = np.argsort(assign, kind="stable")
+    counts = np.bincount(assign, minlength=num_clusters)
+    sums = np.zeros((num_clusters, vectors.shape[1]), dtype=np.float32)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    filled = counts > 0
+    sums[filled] = np.add.reduceat(vectors[order], starts[filled], axis=0)
+    return sums, counts
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (matrix / norms).astype(np.float32)
+
+# spherical k-means on a sample of the rows (centroids are kept at length 1)
+def kmeans(vectors, num_clusters, iterations, rng):
+    sample = vectors[rng.choice(len(vectors), min(len(vectors), TRAIN_SAMPLE), replace=False)]
+    centroids = sample[rng.choice(len(sample), num_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assign = nearest_centroid(sample, centroids)
+        sums, counts = cluster_sums(sample, assign, num_clusters)
+        # empty clusters get a new random starting point
+        empty = counts == 0
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+# builds the index over the rows of a normalized matrix (rows without a vector are left out)
+def build_ann(matrix, num_clusters=None, seed=0):
+    rng = np.random.default_rng(seed)
+    has_vector = np.flatnonzero(np.linalg.norm(matrix, axis=1) > 0)
+    vectors = matrix[has_vector]
+    if num_clusters is None:
+        num_clusters = max(1, int(2 * np.sqrt(len(vectors))))
+    num_clusters = min(num_clusters, len(vectors))
+
+    centroids = kmeans(vectors, num_clusters, KMEANS_ITERATIONS, rng)
+    assign = nearest_centroid(vectors, centroids)
+    order = np.argsort(assign, kind="stable")
+    counts = np.bincount(assign, minlength=num_clusters)
+
+    # largest angle and average cosine between each centroid and its members
+    member_cos = np.clip(np.sum(vectors * centroids[assign], axis=1), -1, 1)
+    radius = np.zeros(num_clusters, dtype=np.float32)
+    np.maximum.at(radius, assign, np.arccos(member_cos).astype(np.float32))
+    mean_cos = np.bincount(assign, weights=member_cos, minlength=num_clusters) / np.maximum(counts, 1)
+
+    return {
+        "centroids": centroids,
+        "rows": has_vector[order],      # matrix rows grouped by cluster
+        "vectors": vectors[order],      # their vectors in the same order
+        "offsets": np.concatenate(([0], np.cumsum(counts))),
+        "radius": radius,
+        "mean_cos": mean_cos.astype(np.float32),
+        "num_words": np.array(len(matrix)),
+    }
+
+# saves the index with a checksum of words (the store's words it was built on, its rows point into them)
+def save_ann(index, words, path=ANN_FILE):
+    from daily import vocab_checksum
+
+    np.savez(path, vocab=np.array(vocab_checksum(words)), **index)
+
+# loads the index, or returns None if it is missing or was built for different words
+# (a word list edited to the same length would otherwise load, with rows pointing at the wrong words)
+def load_ann(path, words):
+    from daily import vocab_checksum
+
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        index = {key: saved[key] for key in saved.files}
+    if int(index["num_words"]) != len(words) or "vocab" not in index or str(index.pop("vocab")) != vocab_checksum(words):
+        print(f"{path} was built for a different word list, rebuild it with: python ann.py build")
+        return None
+    return index
+
+# rows and scores of every member of the given clusters
+def score_clusters(index, vec, clusters):
+    if len(clusters) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    offsets = index["offsets"]
+    rows = np.concatenate([index["rows"][offsets[c]:offsets[c + 1]] for c in clusters])
+    sims = np.concatenate([index["vectors"][offsets[c]:offsets[c + 1]] @ vec for c in clusters])
+    return rows, sims
+
+# rows (and their similarities) of words whose similarity to vec is in [lo, hi)
+def ann_range(index, vec, lo, hi, nprobe=DEFAULT_NPROBE):
+    centroid_sims = np.clip(index["centroids"] @ vec, -1, 1)
+    angles = np.arccos(centroid_sims)
+    # members are within radius of their centroid, so their similarity is between these two bounds
+    highest = np.cos(np.maximum(angles - index["radius"], 0))
+    lowest = np.cos(np.minimum(angles + index["radius"], np.pi))
+    possible = np.flatnonzero((highest >= lo) & (lowest < hi))
+
+    # the clusters whose typical member score is closest to the band are scored first
+    typical = centroid_sims[possible] * index["mean_cos"][possible]
+    distance = np.maximum(lo - typical, 0) + np.maximum(typical - hi, 0)
+    clusters = possible[np.argsort(distance, kind="stable")[:nprobe]]
+
+    rows, sims = score_clusters(index, vec, clusters)
+    in_band = (sims >= lo) & (sims < hi)
+    return rows[in_band], sims[in_band]
+
+# the k rows most similar to vec (most similar first)
+def ann_top_k(index, vec, k, nprobe=DEFAULT_NPROBE):
+    centroid_sims = index["centroids"] @ vec
+    clusters = np.argsort(-centroid_sims, kind="stable")[:nprobe]
+    rows, sims = score_clusters(index, vec, clusters)
+    if len(rows) > k:
+        best = np.argpartition(-sims, k)[:k]
+        rows, sims = rows[best], sims[best]
+    best_first = np.argsort(-sims, kind="stable")
+    return rows[best_first], sims[best_first]
+
+# how many of the exact answers the index finds, averaged over queries (1.0 means it never misses)
+# bands are (lo, hi) similarity ranges like the ones hints ask for
+def recall(index, matrix, query_rows, nprobe=DEFAULT_NPROBE, bands=((0.3, 0.4), (0.4, 0.5), (0.5, 0.7)), k=10):
+    results = {"nprobe": nprobe, "bands": {}, "top_k": None}
+    for lo, hi in bands:
+        found = []
+        seconds = []
+        for row in query_rows:
+            vec = matrix[row]
+            all_sims = matrix @ vec
+            exact = set(np.flatnonzero((all_sims >= lo) & (all_sims < hi)).tolist())
+            start = time.perf_counter()
+            rows, sims = ann_range(index, vec, lo, hi, nprobe)
+            seconds.append(time.perf_counter() - start)
+            if exact:
+                found.append(len(exact & set(rows.tolist())) / len(exact))
+        results["bands"][f"{lo}-{hi}"] = {"recall": float(np.mean(found)) if found else None, "ms": float(np.median(seconds) * 1000)}
+
+    found = []
+    seconds = []
+    for row in query_rows:
+        vec = matrix[row]
+        exact = set(np.argsort(-(matrix @ vec))[:k].tolist())
+        start = time.perf_counter()
+        rows, sims = ann_top_k(index, vec, k, nprobe)
+        seconds.append(time.perf_counter() - start)
+        found.append(len(exact & set(rows.tolist())) / k)
+    results["top_k"] = {"k": k, "recall": float(np.mean(found)), "ms": float(np.median(seconds) * 1000)}
+    return results
+
+
+if __name__ == "__main__":
+    import game
+    from embeddings import store_rows
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    nlp, words_only, bins, store, pairs = game.load_resources(3)
+    matrix = store_rows(store, slice(None))        # float32 even if the store is quantized
+
+    if command == "build":
+        start = time.perf_counter()
+        index = build_ann(matrix)
+        save_ann(index, store["words"])
+        print(f"Wrote {ANN_FILE}: {len(matrix)} words in {len(index['centroids'])} clusters ({time.perf_counter() - start:.1f} s)")
+    elif command == "recall":
+        nprobe = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_NPROBE
+        index = load_ann(ANN_FILE, store["words"])
+        if index is None:
+            sys.exit("build the index first with: python ann.py build")
+        query_rows = np.random.default_rng(0).choice(store["game_words"], min(50, store["game_words"]), replace=False)
+        print(recall(index, matrix, query_rows, nprobe))
+    else:
+        sys.exit("usage: python ann.py build | recall [nprobe]")
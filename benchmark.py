@@ -0,0 +1,252 @@
+"""
+Benchmarks for Semantic Search Party
+
+Times the slow paths of the game without a window and without the 600 MB spaCy model:
+    - startup: scale -> difficulty_score -> make_bins, and building the embedding matrix
+    - get_freq on the real word list (only if wordfreq is installed)
+    - round start (prepare_round: picking the secret word, scoring and sorting the vocabulary)
+    - a single guess (play_round), a hint (hints) and a batch of guesses (score_batch)
+for vocabularies from a few thousand up to a million made-up words.
+
+FakeNLP stands in for en_core_web_lg: it serves a fixed random vector for every vocabulary word
+(seeded, so every run scores the same words the same way) and has no vector for anything else.
+
+Each phase reports p50 and p99 latency in milliseconds. Memory is measured after the timing runs
+(tracemalloc slows allocations down, so it is never on while timing): the embedding matrix, the peak
+allocation of one round start and one 10k batch, and the process's peak RSS.
+Results are saved as JSON so two commits can be compared:
+    python benchmark.py --out before.json
+    python benchmark.py --out after.json --compare before.json
+
+Run it with: python benchmark.py [--sizes 3000,30000,300000,1000000] [--dim 300] [--repeats 200] [--dtype float16]
+"""
+
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import string
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import game
+from embeddings import build_matrix, make_store, make_ladder, quantize
+
+NUM_LEVELS = 3
+MAX_POINTS = 100
+SEED = 1210
+
+
+class FakeVocab:
+    def __init__(self, words, dim, seed):
+        self.vectors_length = dim
+        self.index = {}
+        for i, word in enumerate(words):
+            self.index[word] = i
+        self.vectors = np.random.default_rng(seed).standard_normal((len(words), dim), dtype=np.float32)
+
+    def has_vector(self, word):
+        return word in self.index
+
+    def get_vector(self, word):
+        if word in self.index:
+            return self.vectors[self.index[word]]
+        return np.zeros(self.vectors_length, dtype=np.float32)
+
+
+class FakeDoc(list):
+    def __init__(self, text, vocab):
+        super().__init__(text.split())
+        self.vocab = vocab
+
+    @property
+    def has_vector(self):
+        return any(self.vocab.has_vector(word) for word in self)
+
+    @property
+    def vector(self):
+        return np.mean([self.vocab.get_vector(word) for word in self], axis=0)
+
+
+# just enough of a spaCy Language object for the game: nlp.vocab, nlp.tokenizer and nlp(text)
+class FakeNLP:
+    def __init__(self, words, dim=300, seed=SEED):
+        self.vocab = FakeVocab(words, dim, seed)
+
+    def tokenizer(self, text):
+        return FakeDoc(text, self.vocab)
+
+    def __call__(self, text):
+        return FakeDoc(text, self.vocab)
+
+
+# n different made-up lowercase words (base 26 with a few letters of padding so lengths vary like real words)
+def make_words(n, seed=SEED):
+    rng = random.Random(seed)
+    words = []
+    for i in range(n):
+        letters = ""
+        number = i
+        while True:
+            letters += string.ascii_lowercase[number % 26]
+            number //= 26
+            if number == 0:
+                break
+        padding = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 7)))
+        words.append(padding + letters)
+    return words
+
+# Zipf-like made-up frequencies, like wordfreq's for a real list (an array in the same order as words, like get_freq)
+def make_freqs(words, seed=SEED):
+    rng = np.random.default_rng(seed)
+    ranks = rng.permutation(len(words)) + 1
+    return 1.0 / ranks
+
+def percentiles(times):
+    ms = np.array(times) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 4), "p99_ms": round(float(np.percentile(ms, 99)), 4), "runs": len(times)}
+
+def time_once(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+# times one function repeats times, setup runs before each call and isn't timed
+def time_repeated(fn, repeats, setup=None):
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return percentiles(times)
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+
+
+# most memory Python and NumPy had allocated at once while fn ran
+def traced_peak_mb(fn):
+    tracemalloc.start()
+    fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / 1024 / 1024, 2)
+
+def bench_get_freq(repeats):
+    try:
+        import wordfreq
+    except ImportError:
+        return {"skipped": "wordfreq is not installed"}
+    return time_repeated(game.get_freq, max(1, repeats // 50))
+
+# every phase for one vocabulary size
+def bench_size(size, dim, repeats, dtype):
+    results = {}
+
+    words = make_words(size)
+    freqs = make_freqs(words)
+    nlp = FakeNLP(words, dim)
+
+    seconds, bins = time_once(lambda: game.make_bins(words, game.difficulty_score(game.scale(freqs), words), NUM_LEVELS))
+    results["scale_difficulty_bins"] = percentiles([seconds])
+    seconds, matrix = time_once(lambda: build_matrix(words, nlp))
+    results["build_matrix"] = percentiles([seconds])
+
+    vectors, scale = quantize(matrix, dtype)
+    store = make_store(words, vectors, scale=scale)
+    data = game.new_game(NUM_LEVELS, MAX_POINTS, words, bins, store)
+    rng = random.Random(SEED)
+
+    results["round_start"] = time_repeated(lambda: game.prepare_round(data, rng.randint(1, NUM_LEVELS)), max(5, repeats // 10))
+    game.start_round(data, [])
+
+    guesses = [rng.choice(words) for _ in range(repeats)] + ["notaword", "two words"]
+    guess_iter = iter(guesses * 2)
+    def reset_guesses():
+        game.clear_guesses(data)
+    results["guess"] = time_repeated(lambda: game.play_round(next(guess_iter), data, nlp, []), repeats, reset_guesses)
+
+    def reset_hints():
+        data["max_ss"] = 0
+        data["rh"] = rng.randint(0, 3)
+        data["hinted_rows"] = set()
+        data["ladder"] = make_ladder(data["ladder"]["positions"], data["ladder"]["offsets"], data["ladder"]["seed"])
+    results["hint"] = time_repeated(lambda: game.hints(data, []), repeats, reset_hints)
+
+    batch = [rng.choice(words) for _ in range(10000)]
+    results["score_batch_10k"] = time_repeated(lambda: game.score_batch(batch, data, nlp), max(3, repeats // 20))
+
+    results["memory"] = {
+        "matrix_mb": round(store["matrix"].nbytes / 1024 / 1024, 1),
+        "round_start_peak_mb": traced_peak_mb(lambda: game.prepare_round(data, 1)),
+        "score_batch_10k_peak_mb": traced_peak_mb(lambda: game.score_batch(batch, data, nlp)),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# prints how much slower (>1) or faster (<1) each phase got compared with an older results file
+def compare(results, old_path):
+    with open(old_path, "r") as old_file:
+        old = json.load(old_file)
+    print(f"\nCompared with {old_path} ({old.get('commit')}): new p50 / old p50")
+    for size, phases in results["sizes"].items():
+        for phase, numbers in phases.items():
+            before = old["sizes"].get(size, {}).get(phase, {})
+            if "p50_ms" in numbers and before.get("p50_ms"):
+                print(f"  {size:>9} {phase:<22} {numbers['p50_ms'] / before['p50_ms']:6.2f}x")
+
+def print_results(results):
+    for size, phases in results["sizes"].items():
+        print(f"\n{int(size):,} words")
+        for phase, numbers in phases.items():
+            if "p50_ms" in numbers:
+                print(f"  {phase:<22} p50 {numbers['p50_ms']:>10.3f} ms   p99 {numbers['p99_ms']:>10.3f} ms   ({numbers['runs']} runs)")
+            else:
+                print(f"  {phase:<22} {numbers}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Semantic Search Party benchmarks")
+    parser.add_argument("--sizes", default="3000,30000,300000", help="comma separated vocabulary sizes (up to 1000000)")
+    parser.add_argument("--dim", type=int, default=300, help="vector length of the fake model")
+    parser.add_argument("--repeats", type=int, default=200, help="timed runs of the fast phases")
+    parser.add_argument("--dtype", default="float32", help="how the store keeps its vectors (float32, float16 or int8)")
+    parser.add_argument("--out", default="benchmark_results.json", help="where to save the JSON results")
+    parser.add_argument("--compare", help="an older results file to compare with")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "dim": args.dim,
+        "dtype": args.dtype,
+        "get_freq": bench_get_freq(args.repeats),
+        "sizes": {},
+    }
+    for size in args.sizes.split(","):
+        results["sizes"][str(int(size))] = bench_size(int(size), args.dim, args.repeats, args.dtype)
+
+    print(f"get_freq: {results['get_freq']}")
+    print_results(results)
+    with open(args.out, "w") as out_file:
+        json.dump(results, out_file, indent=2, sort_keys=True)
+    print(f"\nSaved {args.out}")
+    if args.compare:
+        compare(results, args.compare)
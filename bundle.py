@@ -0,0 +1,105 @@
+"""
+Fast-start bundle for Semantic Search Party
+
+Loading en_core_web_lg and looking up every word's frequency takes tens of seconds on every launch.
+The bundle is one .npz file with everything the game needs to start:
+    - the vocabulary and each word's frequency and difficulty score
+    - the words sorted by difficulty and where each level starts
+    - normalized vectors for the vocabulary plus the most common English words (so guesses can be scored),
+      stored as float16 by default (or int8 or float32, see embeddings.quantize)
+The game starts from the bundle alone without importing spaCy or wordfreq.
+
+The bundle keeps a checksum of the word list and the bundle settings, so a bundle built from an
+older word list is ignored instead of silently used. The number of levels isn't part of it: the
+difficulty order is saved, so the game can split it into any number of levels (see game.rebin).
+
+Build it with: python main.py build-bundle [float16|int8|float32]
+(it prints how much the smaller vectors change the scores compared with float32)
+"""
+
+
+import hashlib
+import os
+import numpy as np
+from embeddings import build_matrix, make_store, quantize, quantization_error
+
+BUNDLE_FILE = "game_bundle.npz"
+BUNDLE_VERSION = 2
+GUESS_VOCAB_SIZE = 50000        # most common English words that get a vector in the bundle for scoring guesses
+BUNDLE_DTYPE = "float16"        # how the vectors are stored (float16 scores are within about 0.0001 of float32)
+ERROR_SAMPLE = 200              # secret words used to measure the accuracy loss of the smaller vectors
+
+
+# checksum of everything the bundle is built from
+def source_checksum(word_list_path):
+    checksum = hashlib.sha256()
+    with open(word_list_path, "rb") as word_list:
+        checksum.update(word_list.read())
+    checksum.update(f"{GUESS_VOCAB_SIZE}/{BUNDLE_VERSION}".encode())
+    return checksum.hexdigest()
+
+# common words that can be guessed but aren't in the game's vocabulary
+def guess_only_words(words_only, nlp):
+    from wordfreq import top_n_list
+
+    in_vocab = set(words_only)
+    extra = []
+    for word in top_n_list("en", GUESS_VOCAB_SIZE):
+        if word not in in_vocab and nlp.vocab.has_vector(word):
+            extra.append(word)
+            in_vocab.add(word)
+    return extra
+
+# writes the bundle (freqs, scores and bins come from get_freq, difficulty_score and make_bins)
+# returns the number of word vectors and the accuracy report for dtype (see embeddings.quantization_error)
+def build_bundle(path, nlp, freqs, words_only, scores, bins, word_list_path="cleaned_word_list.txt", dtype=BUNDLE_DTYPE):
+    all_words = words_only + guess_only_words(words_only, nlp)
+
+    matrix = build_matrix(all_words, nlp)
+    vectors, scale = quantize(matrix, dtype)
+    secret_rows = np.random.default_rng(0).choice(len(words_only), min(ERROR_SAMPLE, len(words_only)), replace=False)
+    report = quantization_error(matrix, dtype, secret_rows, len(words_only))
+
+    np.savez(
+        path,
+        checksum=np.array(source_checksum(word_list_path)),
+        words=np.array(all_words),
+        game_words=np.array(len(words_only)),
+        freqs=np.asarray(freqs, dtype=np.float64),
+        scores=np.asarray(scores, dtype=np.float64),
+        bin_order=bins["order"],
+        bin_edges=bins["edges"],
+        vectors=vectors,
+        scale=np.zeros(0, dtype=np.float32) if scale is None else scale,
+    )
+    return len(all_words), report
+
+# loads the bundle, or returns None if it is missing or was built from a different word list
+# (its bins have as many levels as when it was built)
+def load_bundle(path, word_list_path="cleaned_word_list.txt"):
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path) as saved:
+        if str(saved["checksum"]) != source_checksum(word_list_path):
+            print(f"{path} is out of date, rebuild it with: python main.py build-bundle")
+            return None
+
+        all_words = saved["words"].tolist()
+        game_words = int(saved["game_words"])
+        words_only = all_words[:game_words]
+        freqs = saved["freqs"]
+        scores = saved["scores"]
+        bin_order = saved["bin_order"]
+        bin_edges = saved["bin_edges"]
+        vectors = saved["vectors"]
+        # an empty scale means the vectors aren't int8 (bundles from before quantization have no scale at all)
+        scale = saved["scale"] if "scale" in saved.files and len(saved["scale"]) else None
+
+    return {
+        "words_only": words_only,
+        "freqs": freqs,
+        "scores": scores,
+        "bins": {"words": words_only, "order": bin_order, "edges": bin_edges},
+        "store": make_store(all_words, vectors, game_words, scale),
+    }
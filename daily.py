@@ -0,0 +1,154 @@
+"""
+Daily puzzles for Semantic Search Party
+
+Like Semantle's "word of the day": everyone who plays on the same date gets the same secret word for
+each level, the same similarity table and the same hints. The puzzles are computed ahead of time,
+one small file per day in daily/ (daily/2026-10-18.npz), holding for every level:
+    - the secret word (picked from that level's bin with the date as the seed)
+    - the similarity table: every vocabulary word's position in sorted order (order) and the sorted
+      scores as float16 (sorted_ss)
+    - the hint ladder (see embeddings.build_ladder), shuffled with the date as the seed
+Nothing is loaded until a game asks for a date; the day's file is then read once (a few tens of KB)
+and every round of every game playing that day is just a lookup, so a daily round doesn't score anything.
+
+The files are built by a pool of processes that all read the word vectors from shared memory
+(shared_store.py), and every day is independent, so building scales with the number of cores.
+
+Build a year starting today with: python daily.py [first date] [number of days] [number of workers]
+Play today's puzzle with: python main.py daily
+"""
+
+
+import datetime
+import hashlib
+import os
+import random
+import sys
+import time
+import numpy as np
+from embeddings import make_table, build_ladder, make_ladder, sort_table, store_vector
+
+DAILY_DIR = "daily"
+DAYS = 365
+
+
+def day_path(date, daily_dir=DAILY_DIR):
+    return os.path.join(daily_dir, f"{date}.npz")
+
+# identifies the vocabulary a puzzle was built for (positions in the file only make sense with the same word list)
+def vocab_checksum(words_only):
+    return hashlib.sha256("\n".join(words_only).encode()).hexdigest()
+
+# the same random numbers for every player on the same date
+def day_seed(date, level):
+    return int.from_bytes(hashlib.sha256(f"{date}/{level}".encode()).digest()[:8], "little")
+
+
+# every worker process attaches to the shared vectors and keeps the bins it picks secret words from
+worker_state = {}
+
+def init_worker(handle, bins, daily_dir):
+    import shared_store
+
+    shared_store.init_worker(handle)
+    worker_state["bins"] = bins
+    worker_state["daily_dir"] = daily_dir
+
+# computes and writes one day's puzzle, run in a worker
+def build_day(date):
+    import game
+    import shared_store
+
+    store = shared_store.worker_state["store"]
+    bins = worker_state["bins"]
+    num_levels = len(bins["edges"]) - 1
+    index_type = np.min_scalar_type(store["game_words"])
+
+    secrets = []
+    orders = []
+    sorted_scores = []
+    ladder_positions = []
+    ladder_offsets = []
+    for level in range(1, num_levels + 1):
+        secret_word = game.choose_word(bins, level, random.Random(day_seed(date, level)))
+        table = sort_table(shared_store.round_table(secret_word))
+        ladder = build_ladder(table, np.random.default_rng(day_seed(date, level)))
+        secrets.append(secret_word)
+        orders.append(table["order"].astype(index_type))
+        sorted_scores.append(table["sorted_ss"].astype(np.float16))
+        ladder_positions.append(ladder["positions"].astype(index_type))
+        ladder_offsets.append(ladder["offsets"].astype(index_type))
+
+    path = day_path(date, worker_state["daily_dir"])
+    np.savez(
+        path[:-len(".npz")] + ".tmp.npz",
+        vocab=np.array(vocab_checksum(store["words"][:store["game_words"]])),
+        secrets=np.array(secrets),
+        order=np.stack(orders),
+        sorted_ss=np.stack(sorted_scores),
+        ladder_positions=np.stack(ladder_positions),
+        ladder_offsets=np.stack(ladder_offsets),
+    )
+    os.replace(path[:-len(".npz")] + ".tmp.npz", path)
+    return date
+
+# builds the puzzles for days days starting at first_date (a datetime.date) on workers processes
+# (multiprocessing is only imported here, a game that just opens a day doesn't need it)
+def build_days(store, bins, first_date, days=DAYS, workers=None, daily_dir=DAILY_DIR):
+    from concurrent.futures import ProcessPoolExecutor
+    import shared_store
+
+    os.makedirs(daily_dir, exist_ok=True)
+    dates = [(first_date + datetime.timedelta(days=i)).isoformat() for i in range(days)]
+    handle, blocks = shared_store.publish_store(store)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(handle, bins, daily_dir)) as pool:
+            return list(pool.map(build_day, dates, chunksize=4))
+    finally:
+        shared_store.release(blocks)
+
+
+# reads a day's puzzle, or returns None if it wasn't built or was built for a different word list or number of levels
+# (everything is read at once and the file is closed, so games on different threads can share the result)
+def open_day(date, words_only, NUM_LEVELS, daily_dir=DAILY_DIR):
+    path = day_path(date, daily_dir)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        day = {key: saved[key] for key in saved.files}
+    if str(day["vocab"]) != vocab_checksum(words_only) or len(day["secrets"]) != NUM_LEVELS:
+        print(f"{path} was built for a different word list or number of levels, rebuild it with: python daily.py")
+        return None
+    day["date"] = str(date)
+    day["secrets"] = day["secrets"].tolist()
+    return day
+
+# a prepared round (like game.prepare_round returns) read from the day's file
+def daily_round(day, level, store):
+    secret_word = day["secrets"][level - 1]
+    order = day["order"][level - 1].astype(np.int64)
+    sorted_ss = day["sorted_ss"][level - 1].astype(np.float32)
+    ss_list = np.empty(len(order), dtype=np.float32)
+    ss_list[order] = sorted_ss
+    ladder = make_ladder(day["ladder_positions"][level - 1].astype(np.int64), day["ladder_offsets"][level - 1].astype(np.int64), day_seed(day["date"], level))
+    return {
+        "level": level,
+        "sw": secret_word,
+        "sv": store_vector(store, secret_word),
+        "ss_list": ss_list,
+        "table": make_table(order, sorted_ss),
+        "ladder": ladder,
+    }
+
+
+if __name__ == "__main__":
+    import game
+
+    first_date = datetime.date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else datetime.date.today()
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else DAYS
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    nlp, words_only, bins, store, pairs = game.load_resources(3)
+    start = time.perf_counter()
+    built = build_days(store, bins, first_date, days, workers)
+    print(f"Wrote {len(built)} daily puzzles ({built[0]} to {built[-1]}) to {DAILY_DIR}/ in {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,230 @@
+"""
+Embedding matrix for Semantic Search Party
+
+Every vocabulary word's vector is stacked into one NumPy matrix (one row per word) once at startup.
+The rows are normalized, so the cosine similarity between the secret word and every word in the
+vocabulary is a single matrix-vector product instead of one spaCy call per word.
+
+Single words never go through the spaCy pipeline: their vectors are read straight from nlp.vocab.
+Only input that the tokenizer splits into several tokens (like "ice cream") falls back to nlp().
+
+The matrix can be kept smaller than float32 (see quantize):
+    - float16 halves it
+    - int8 quarters it, with one float32 scale per row that makes the row length 1 again
+Scores are computed on the small matrix a block of rows at a time, so a full float32 copy never exists.
+quantization_error() reports how far those scores are from the float32 ones.
+"""
+
+
+import numpy as np
+from lru_cache import make_cache, cache_get, cache_put
+
+# the game only reads word vectors, so the model is loaded without these components
+UNUSED_PIPES = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "senter"]
+
+VECTOR_CACHE_BYTES = 16 * 1024 * 1024       # memory cap for cached vectors of guesses that aren't in the store
+VECTOR_DTYPES = ("float32", "float16", "int8")
+HINT_BAND = 0.05            # width of the similarity bands in a hint ladder
+SCORE_BLOCK_ROWS = 1024        # rows turned back into float32 at once when scoring a float16 or int8 matrix
+
+# scaling each row to length 1 so cosine similarity is just a dot product
+# rows of all zeros (words without a vector) are left as zeros so they score 0.0 like before
+def normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (matrix / norms).astype(np.float32)
+
+# scaling one vector to length 1 (a zero vector stays zero, which scores 0.0 against everything)
+def unit(vec):
+    vec = np.asarray(vec, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    if norm == 0:
+        return np.zeros_like(vec)
+    return vec / norm
+
+# unit vector of a guess, looked up in the vocab table without running the pipeline
+# multi-token input uses the average token vector from nlp() like a spaCy Doc does
+def word_vector(text, nlp):
+    if nlp.vocab.has_vector(text):
+        return unit(nlp.vocab.get_vector(text))
+
+    tokens = nlp.tokenizer(text)
+    if len(tokens) > 1:
+        doc = nlp(text)
+        if doc.has_vector:
+            return unit(doc.vector)
+    return np.zeros(nlp.vocab.vectors_length, dtype=np.float32)
+
+# getting the vector of every word from the vocab table and stacking them into one matrix
+def build_matrix(words, nlp):
+    matrix = np.zeros((len(words), nlp.vocab.vectors_length), dtype=np.float32)
+    for i, word in enumerate(words):
+        matrix[i] = word_vector(word, nlp)
+    return normalize(matrix)
+
+# a normalized float32 matrix in a smaller dtype, returns (matrix, scale)
+# scale is None except for int8, where row i times scale[i] is row i's unit vector
+def quantize(matrix, dtype):
+    if dtype == "float32":
+        return matrix.astype(np.float32, copy=False), None
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    if dtype == "int8":
+        peaks = np.abs(matrix).max(axis=1, keepdims=True)
+        peaks[peaks == 0] = 1
+        rows = np.round(matrix / peaks * 127).astype(np.int8)
+        norms = np.linalg.norm(rows.astype(np.float32), axis=1)
+        scale = np.zeros(len(rows), dtype=np.float32)
+        scale[norms > 0] = 1 / norms[norms > 0]
+        return rows, scale
+    raise ValueError(f"unknown vector dtype {dtype}, use one of {', '.join(VECTOR_DTYPES)}")
+
+# similarity of vec to every row of a (possibly quantized) matrix
+def score_rows(matrix, scale, vec):
+    if matrix.dtype == np.float32:
+        return matrix @ vec
+    scores = np.empty(len(matrix), dtype=np.float32)
+    for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+        scores[start:start + SCORE_BLOCK_ROWS] = matrix[start:start + SCORE_BLOCK_ROWS].astype(np.float32) @ vec
+    if scale is not None:
+        scores *= scale
+    return scores
+
+# the store keeps the words, their row numbers and the normalized matrix together
+# only the first game_words rows are the game's vocabulary, any rows after that are extra words that can be guessed
+# matrix and scale can come from quantize (scale is only needed for int8)
+def make_store(words, matrix, game_words=None, scale=None):
+    if game_words is None:
+        game_words = len(words)
+    index = {}
+    for i, word in enumerate(words):
+        index[word] = i
+    return {
+        "words": words,
+        "index": index,
+        "matrix": matrix,
+        "scale": scale,
+        "game_words": game_words,
+        "vector_cache": make_cache(VECTOR_CACHE_BYTES),      # unit vectors of guesses that had to come from the model
+        "score_cache": None,        # optional (secret word, guess) -> score cache, see lru_cache.py
+        "ann": None,                # optional index for hints over every word in the store, see ann.py
+        "spell": None,              # optional index that turns away guesses that aren't words, see spell.py
+    }
+
+# float32 unit vectors of some rows of the store (an int, a list or array of ints, or a slice)
+def store_rows(store, rows):
+    vecs = store["matrix"][rows].astype(np.float32, copy=False)
+    if store["scale"] is not None:
+        scale = store["scale"][rows]
+        vecs = vecs * (scale[..., None] if np.ndim(scale) else scale)
+    return vecs
+
+# unit vector of a vocabulary word
+def store_vector(store, word):
+    return store_rows(store, store["index"][word])
+
+# similarity of vec to some rows of the store (an array of row numbers)
+def row_scores(store, rows, vec):
+    scale = None if store["scale"] is None else store["scale"][rows]
+    return score_rows(store["matrix"][rows], scale, vec)
+
+# unit vector of a guess: a row of the store if the word is in it, otherwise the vocab table
+# without a model (nlp is None when the game started from the bundle) multi-word guesses average the words found in the store
+# vectors that weren't a row of the store are cached, so guessing the same word again skips the model
+def lookup_vector(store, text, nlp):
+    if text in store["index"]:
+        return store_vector(store, text)
+
+    vec = cache_get(store["vector_cache"], text)
+    if vec is not None:
+        return vec
+
+    if nlp is not None:
+        vec = word_vector(text, nlp)
+    else:
+        rows = [store["index"][word] for word in text.split() if word in store["index"]]
+        if rows:
+            vec = unit(store_rows(store, rows).mean(axis=0))
+        else:
+            vec = np.zeros(store["matrix"].shape[1], dtype=np.float32)
+
+    vec.flags.writeable = False         # the same array is handed to every game that guesses this word
+    cache_put(store["vector_cache"], text, vec, vec.nbytes)
+    return vec
+
+# similarity of one unit vector to every vocabulary word, in the same order as store["words"]
+def similarity_table(store, vec):
+    game_words = store["game_words"]
+    scale = None if store["scale"] is None else store["scale"][:game_words]
+    return score_rows(store["matrix"][:game_words], scale, vec)
+
+# sorting a round's table once so hints and ranks never have to scan it again
+# order[p] is the word with the p-th lowest similarity and ranks[word] is its place counting from the most similar (1)
+def sort_table(ss_list):
+    order = np.argsort(ss_list, kind="stable")
+    return make_table(order, ss_list[order])
+
+# the table from an order that is already known (a saved daily puzzle keeps only these two arrays)
+def make_table(order, sorted_ss):
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order), 0, -1)
+    return {
+        "order": order,
+        "sorted_ss": sorted_ss,
+        "ranks": ranks,
+    }
+
+# a round's hint ladder: the sorted table cut into similarity bands HINT_BAND wide, each band's positions shuffled by rng
+# band b (words scoring from b * HINT_BAND up to (b + 1) * HINT_BAND, band 0 also has every negative score)
+# is positions[offsets[b]:offsets[b + 1]], so the same rng always gives the same hints
+# (seed is kept with the ladder for picking between bands, see game.ladder_hint)
+def build_ladder(table, rng, seed=0):
+    num_bands = int(round(1 / HINT_BAND))
+    offsets = np.searchsorted(table["sorted_ss"], np.arange(num_bands + 1) * HINT_BAND, side="left")
+    offsets[0] = 0
+    offsets[-1] = len(table["sorted_ss"])
+    positions = np.arange(len(table["sorted_ss"]))
+    for band in range(num_bands):
+        rng.shuffle(positions[offsets[band]:offsets[band + 1]])
+    return make_ladder(positions, offsets, seed)
+
+# the ladder from positions and offsets that are already known (a daily puzzle or a snapshot keeps these)
+# band b's words that haven't been popped as hints are positions[heads[b]:offsets[b + 1]] (see game.ladder_hint),
+# so each round needs its own heads
+def make_ladder(positions, offsets, seed=0, heads=None):
+    return {"positions": positions, "offsets": offsets, "seed": seed, "heads": offsets[:-1].tolist() if heads is None else list(heads)}
+
+# rank a similarity score would have among the vocabulary (1 + the number of words that are more similar)
+def rank_of_score(table, ss):
+    return len(table["sorted_ss"]) - int(np.searchsorted(table["sorted_ss"], ss, side="right")) + 1
+
+# how far the scores of a quantized matrix are from the float32 ones (matrix is normalized float32)
+# each query row plays the secret word, scored against the first game_words rows like a round's table
+def quantization_error(matrix, dtype, query_rows, game_words=None, top=10):
+    if game_words is None:
+        game_words = len(matrix)
+    rows, scale = quantize(matrix, dtype)
+    errors = []
+    overlaps = []
+    rank_shifts = []
+    for row in query_rows:
+        exact = matrix[:game_words] @ matrix[row]
+        secret_vec = rows[row].astype(np.float32) * (1 if scale is None else scale[row])
+        approx = score_rows(rows[:game_words], None if scale is None else scale[:game_words], secret_vec)
+        errors.append(np.abs(approx - exact))
+
+        exact_ranks = sort_table(exact)["ranks"]
+        approx_ranks = sort_table(approx)["ranks"]
+        overlaps.append(len(set(np.argsort(-exact)[:top].tolist()) & set(np.argsort(-approx)[:top].tolist())) / top)
+        rank_shifts.append(np.abs(exact_ranks - approx_ranks).mean())
+
+    errors = np.concatenate(errors)
+    return {
+        "dtype": dtype,
+        "mb": round((rows.nbytes + (0 if scale is None else scale.nbytes)) / 1024 / 1024, 1),
+        "float32_mb": round(matrix.nbytes / 1024 / 1024, 1),
+        "max_abs_error": float(errors.max()),
+        "mean_abs_error": float(errors.mean()),
+        f"top{top}_overlap": float(np.mean(overlaps)),
+        "mean_rank_shift": float(np.mean(rank_shifts)),
+    }
@@ -0,0 +1,165 @@
+"""
+Word frequency cache for Semantic Search Party
+
+Looking a word up in wordfreq means loading wordfreq's tables (slow to import) and, for anything that
+isn't a plain lowercase word, tokenizing it. With bigger word lists that was a large part of startup.
+This keeps every frequency that was ever looked up on disk, per (language, wordlist):
+    freq_cache/en_best.keys.u64     64-bit hash of each word, sorted
+    freq_cache/en_best.freqs.f64    its frequency, in the same order
+    freq_cache/en_best.json         the wordfreq version the numbers came from
+Looking up a list of words is then one vectorized binary search (a second or less for 500k words,
+most of it hashing them). Words the cache doesn't have are
+looked up in wordfreq together (one frequency table for the whole batch, see lookup_freqs), added,
+and written back once. When the installed wordfreq version changes, the cache starts over, since
+the numbers may have changed.
+
+wordfreq is only imported when there is something to look up; if it isn't installed at all, the
+cache is trusted as it is.
+
+Fill it for the word list with: python freq_cache.py
+"""
+
+
+import hashlib
+import json
+import math
+import os
+import numpy as np
+
+CACHE_DIR = "freq_cache"
+LANG = "en"
+WORDLIST = "best"
+
+
+def word_hash(word):
+    return int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+
+# the same hashes for a list of words, the digests are joined and read as one array (faster than converting each one)
+def word_hashes(words):
+    blake2b = hashlib.blake2b
+    return np.frombuffer(b"".join([blake2b(word.encode(), digest_size=8).digest() for word in words]), dtype="<u8").astype(np.uint64)
+
+# the installed wordfreq version (read from its metadata, so wordfreq isn't imported), or None if it isn't installed
+def wordfreq_version():
+    from importlib.metadata import version, PackageNotFoundError
+
+    try:
+        return version("wordfreq")
+    except PackageNotFoundError:
+        return None
+
+# word_frequency rounds to 3 significant digits, the batch lookup does the same so the numbers are identical
+def round_freq(freq):
+    if freq == 0:
+        return 0.0
+    return round(freq, math.floor(-math.log(freq, 10)) + 3)
+
+# frequencies of a batch of words, the same numbers word_frequency(word, lang, wordlist=wordlist, minimum=0.0) gives
+# plain lowercase words are read straight from wordfreq's table, anything else still goes through word_frequency
+def lookup_freqs(words, lang=LANG, wordlist=WORDLIST):
+    from wordfreq import get_frequency_dict, word_frequency
+
+    table = get_frequency_dict(lang, wordlist=wordlist)
+    freqs = np.zeros(len(words), dtype=np.float64)
+    for i, word in enumerate(words):
+        if word.isascii() and word.isalpha() and word.islower():
+            if word in table:
+                freqs[i] = round_freq(1.0 / (1.0 / table[word]))
+        else:
+            freqs[i] = word_frequency(word, lang, wordlist=wordlist, minimum=0.0)
+    return freqs
+
+def cache_paths(lang, wordlist, cache_dir):
+    base = os.path.join(cache_dir, f"{lang}_{wordlist}")
+    return {"keys": base + ".keys.u64", "freqs": base + ".freqs.f64", "meta": base + ".json"}
+
+# the cache for one (language, wordlist), empty if there isn't one or it came from a different wordfreq version
+def open_cache(lang=LANG, wordlist=WORDLIST, cache_dir=CACHE_DIR):
+    paths = cache_paths(lang, wordlist, cache_dir)
+    cache = {
+        "lang": lang,
+        "wordlist": wordlist,
+        "dir": cache_dir,
+        "version": wordfreq_version(),
+        "keys": np.zeros(0, dtype=np.uint64),
+        "freqs": np.zeros(0, dtype=np.float64),
+        "changed": False,       # True when words were added since it was opened
+    }
+    if not os.path.exists(paths["meta"]):
+        return cache
+    with open(paths["meta"], "r") as meta_file:
+        meta = json.load(meta_file)
+    if cache["version"] is not None and meta["wordfreq"] != cache["version"]:
+        print(f"{paths['meta']} was made with wordfreq {meta['wordfreq']}, looking frequencies up again for {cache['version']}")
+        cache["changed"] = True
+        return cache
+    cache["version"] = meta["wordfreq"]
+    cache["keys"] = np.fromfile(paths["keys"], dtype=np.uint64)
+    cache["freqs"] = np.fromfile(paths["freqs"], dtype=np.float64)
+    if len(cache["keys"]) != meta["rows"] or len(cache["freqs"]) != meta["rows"]:
+        # a write that stopped halfway, start over
+        cache["keys"] = np.zeros(0, dtype=np.uint64)
+        cache["freqs"] = np.zeros(0, dtype=np.float64)
+    return cache
+
+# frequencies of words as one float64 array, the ones the cache doesn't have are looked up together and added
+def cached_freqs(cache, words):
+    hashes = word_hashes(words)
+    keys = cache["keys"]
+    # searching in sorted order walks the cache's keys front to back instead of jumping around them
+    by_hash = np.argsort(hashes)
+    pos = np.empty(len(words), dtype=np.intp)
+    pos[by_hash] = np.searchsorted(keys, hashes[by_hash])
+    np.minimum(pos, max(len(keys) - 1, 0), out=pos)
+    found = np.zeros(len(words), dtype=bool) if len(keys) == 0 else keys[pos] == hashes
+    freqs = np.zeros(len(words), dtype=np.float64)
+    freqs[found] = cache["freqs"][pos[found]]
+
+    missing = np.flatnonzero(~found)
+    if len(missing):
+        # a word can be in the batch twice, it is only added once
+        new_keys, first = np.unique(hashes[missing], return_index=True)
+        new_freqs = lookup_freqs([words[i] for i in missing[first]], cache["lang"], cache["wordlist"])
+        freqs[missing] = new_freqs[np.searchsorted(new_keys, hashes[missing])]
+        keys = np.concatenate((keys, new_keys))
+        order = np.argsort(keys, kind="stable")
+        cache["keys"] = keys[order]
+        cache["freqs"] = np.concatenate((cache["freqs"], new_freqs))[order]
+        cache["changed"] = True
+        if cache["version"] is None:
+            cache["version"] = wordfreq_version()
+    return freqs
+
+# writes the cache back if words were added (the files are replaced, so a reader never sees half of one)
+def save_cache(cache):
+    if not cache["changed"]:
+        return
+    os.makedirs(cache["dir"], exist_ok=True)
+    paths = cache_paths(cache["lang"], cache["wordlist"], cache["dir"])
+    cache["keys"].tofile(paths["keys"] + ".tmp")
+    cache["freqs"].tofile(paths["freqs"] + ".tmp")
+    with open(paths["meta"] + ".tmp", "w") as meta_file:
+        json.dump({"wordfreq": cache["version"], "lang": cache["lang"], "wordlist": cache["wordlist"], "rows": len(cache["keys"])}, meta_file, indent=2)
+    for path in paths.values():
+        os.replace(path + ".tmp", path)
+    cache["changed"] = False
+
+# frequencies of words from the cache in cache_dir, saving whatever had to be looked up
+def word_freqs(words, lang=LANG, wordlist=WORDLIST, cache_dir=CACHE_DIR):
+    cache = open_cache(lang, wordlist, cache_dir)
+    freqs = cached_freqs(cache, words)
+    save_cache(cache)
+    return freqs
+
+
+if __name__ == "__main__":
+    import time
+    import game
+
+    words = game.read_words()
+    start = time.perf_counter()
+    cache = open_cache()
+    had = len(cache["keys"])
+    cached_freqs(cache, words)
+    save_cache(cache)
+    print(f"{len(words)} words: {had} were cached, {len(cache['keys']) - had} looked up ({time.perf_counter() - start:.2f} s)")
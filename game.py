@@ -0,0 +1,542 @@
+"""
+Game logic for Semantic Search Party
+
+Everything the game does that isn't drawing the window: loading the word list and its difficulty levels,
+picking secret words, scoring guesses, hints, letter reveals, points and levels.
+None of it uses tkinter, so the same functions run the Tk window (main.py) and the game server (server.py).
+
+Instead of printing, the functions append what the player should see to a list called out:
+    ("text", message)
+    ("guess", guess number, word, similarity, rank, number of vocabulary words)
+and each front end shows those however it wants.
+"""
+
+
+import random 
+import numpy as np
+from embeddings import UNUSED_PIPES, HINT_BAND, lookup_vector, build_matrix, make_store, store_vector, row_scores, similarity_table, sort_table, build_ladder, rank_of_score
+from ann import ANN_FILE, load_ann, ann_range, ann_top_k
+from spell import build_spell, is_word, suggest
+from lru_cache import FLOAT_BYTES, cache_get, cache_put
+from session import Session, is_guessed, mark_guessed, num_guessed, guessed_words, clear_guesses
+import metrics
+from metrics import timed
+
+HINT_PENALTY = 5        # points a hint costs
+REVEAL_PENALTY = 10     # points a letter reveal costs
+
+# spaCy and wordfreq are only imported when they are needed, so starting from the bundle never loads them
+# the same goes for the modules that read the bundle, the all-pairs table, the frequency column and daily puzzles:
+# importing game only costs NumPy and a few milliseconds, so tools that just want make_bins or difficulty_score stay fast
+@timed("load_model")
+def load_model():
+    import en_core_web_lg
+    return en_core_web_lg.load(exclude=UNUSED_PIPES)
+
+# reading the game's vocabulary from the cleaned word list
+def read_words():
+    words_only = []
+    with open("cleaned_word_list.txt", "r") as word_list:
+        word_list.readline()
+        for line in word_list:
+            word = line.strip()
+            words_only.append(word)    
+    return words_only
+
+# getting word frequencies from a list of words, as one float64 array in the same order as the words
+# the frequency column written by updating_list.py is used when it matches the word list, otherwise the
+# frequency cache (freq_cache.py), which only asks wordfreq about words it hasn't seen before
+@timed("get_freq")
+def get_freq():
+    from updating_list import load_freqs
+
+    words_only = read_words()
+
+    freqs = load_freqs()
+    # read_words skips the first line of the list, the column has a row for it
+    if freqs is not None and len(freqs) == len(words_only) + 1:
+        return freqs[1:], words_only
+
+    from freq_cache import word_freqs
+
+    return word_freqs(words_only), words_only
+
+#scaling frequencies to be between 0 and 1
+def scale(freqs):
+    freqs = np.asarray(freqs, dtype=np.float64)
+    min_freq = freqs.min()
+    span = freqs.max() - min_freq
+    if span == 0:
+        return np.zeros(len(freqs))
+    return (freqs - min_freq) / span
+
+# adding in the length of each word as a factor that determines the difficulty level
+def difficulty_score(scaled_freqs, words):
+    lengths = np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words))
+    return (1 - scaled_freqs) + lengths / lengths.max()
+
+# sorts the words into levels corresponding to their difficulty based on the number of total levels in the game
+# order lists the words from easiest to hardest and level L is the slice order[edges[L - 1]:edges[L]]
+# (every level has the same number of words, the last one also gets the leftovers)
+@timed("make_bins")
+def make_bins(words, scores, NUM_LEVELS):
+    return rebin({"words": words, "order": np.argsort(scores, kind="stable")}, NUM_LEVELS)
+
+# the same words split into a different number of levels (the sorted order is reused, so this is only new edges)
+def rebin(bins, NUM_LEVELS):
+    num_words = len(bins["order"])
+    bin_size = num_words // NUM_LEVELS
+    edges = np.arange(NUM_LEVELS + 1) * bin_size
+    edges[-1] = num_words
+    return {"words": bins["words"], "order": bins["order"], "edges": edges}
+
+# the words in one level (for showing or saving them, choose_word doesn't need this)
+def level_words(bins, level):
+    return [bins["words"][i] for i in bins["order"][bins["edges"][level - 1]:bins["edges"][level]]]
+
+# choosing a word based on the difficulty of the current level (rng can be a seeded random.Random)
+def choose_word(bins, level, rng=random):
+    pos = rng.randrange(int(bins["edges"][level - 1]), int(bins["edges"][level]))
+    return bins["words"][bins["order"][pos]]
+
+# using spacy's word vectors to get similarity scores (secret_vec is the secret word's unit vector)
+# words without a vector get a zero vector, so they still score 0.0
+# if the store has a score cache, scores are remembered per (secret word, guess)
+@timed("semantic_similarity")
+def semantic_similarity(secret_vec, guess, store, nlp, secret_word=None):
+    if secret_word is not None and store["score_cache"] is not None:
+        ss = cache_get(store["score_cache"], (secret_word, guess))
+        if ss is None:
+            ss = float(secret_vec @ lookup_vector(store, guess, nlp))
+            cache_put(store["score_cache"], (secret_word, guess), ss, FLOAT_BYTES)
+        return ss
+
+    guess_vec = lookup_vector(store, guess, nlp)
+    return float(secret_vec @ guess_vec)
+
+# everything the games share: starting from the bundle if there is an up to date one,
+# otherwise loading the model and computing everything (nlp is None when the bundle is used)
+def load_resources(NUM_LEVELS):
+    from all_pairs import ALL_PAIRS_FILE, load_all_pairs
+    from bundle import BUNDLE_FILE, load_bundle
+
+    bundle = load_bundle(BUNDLE_FILE)
+    if bundle:
+        nlp = None
+        words_only = bundle["words_only"]
+        bins = rebin(bundle["bins"], NUM_LEVELS)
+        store = bundle["store"]
+    else:
+        nlp = load_model()
+        freqs, words_only = get_freq()
+        bins = make_bins(words_only, difficulty_score(scale(freqs), words_only), NUM_LEVELS)
+        store = make_store(words_only, build_matrix(words_only, nlp))
+    pairs = load_all_pairs(ALL_PAIRS_FILE, words_only)
+    store["ann"] = load_ann(ANN_FILE, store["words"])
+    store["spell"] = build_spell(store["words"])
+    return nlp, words_only, bins, store, pairs
+
+# a fresh game's stats for one player (a Session, see session.py, used like a dictionary: data["rp"])
+# words_only, bins, store and pairs are only read, so every game in the same process can share them
+def new_game(NUM_LEVELS, MAX_POINTS, words_only, bins, store, pairs=None, executor=None):
+    return Session(NUM_LEVELS, MAX_POINTS, words_only, bins, store, pairs, executor)
+
+# adds a message for the player
+def say(msg, out):
+    out.append(("text", msg.strip()))
+
+# adds a guess (or hint) row for the player and numbers it
+# rank is the guess's place among all vocabulary words like Contexto shows it (#1 is the secret word)
+def add_guess(data, out, word, ss, rank):
+    data["num_guess"] += 1
+    out.append(("guess", data["num_guess"], word.strip(), ss, rank, len(data["words_only"])))
+
+# the round's hint ladder, shuffled with a seed from the random module (seeding random seeds the hints too)
+def round_ladder(table):
+    seed = random.getrandbits(64)
+    return build_ladder(table, np.random.default_rng(seed), seed)
+
+# choosing the secret word for a level, scoring the vocabulary against it and laying out the round's hints
+# only reads data, so it can run on the prefetch thread while the current round is played
+# (a store with an ANN index gives hints from the index instead, so its rounds have no ladder)
+@timed("prepare_round")
+def prepare_round(data, level):
+    if data["daily"] is not None:
+        from daily import daily_round
+
+        return daily_round(data["daily"], level, data["store"])
+
+    secret_word = choose_word(data["bins"], level)
+    secret_vec = store_vector(data["store"], secret_word)
+
+    # the secret word's row of the precomputed all-pairs table if it was built, otherwise one matrix-vector product
+    if data["pairs"] is not None:
+        ss_list = np.asarray(data["pairs"][data["store"]["index"][secret_word]], dtype=np.float32)
+    else:
+        ss_list = similarity_table(data["store"], secret_vec)
+
+    table = sort_table(ss_list)
+    ladder = None if data["store"]["ann"] is not None else round_ladder(table)
+    return {"level": level, "sw": secret_word, "sv": secret_vec, "ss_list": ss_list, "table": table, "ladder": ladder}
+
+# starts preparing the next level's round in the background (nothing to prepare after the last level)
+# a round that is going to be profiled is prepared when it starts instead, so the profile includes it
+def prefetch_round(data):
+    cancel_prefetch(data)
+    next_level = data["level"] + 1
+    if data["executor"] is not None and next_level <= data["NUM_LEVELS"] and not metrics.will_profile(next_level):
+        data["next_round"] = (next_level, data["executor"].submit(prepare_round, data, next_level))
+
+# drops a prefetched round that won't be used (cancels it if it hasn't started yet)
+def cancel_prefetch(data):
+    if data["next_round"] is not None:
+        level, future = data["next_round"]
+        future.cancel()
+        data["next_round"] = None
+
+# the prefetched round if it was prepared for the current level, otherwise preparing it now
+# (after a restart the prefetched round is for the wrong level so it is thrown away)
+def get_round(data):
+    if data["next_round"] is not None:
+        level, future = data["next_round"]
+        data["next_round"] = None
+        if level == data["level"] and not future.cancelled():
+            return future.result()
+        future.cancel()
+    return prepare_round(data, data["level"])
+
+# resetting game stats for a new round, or printing the final stats if the game is over
+# returns False when there are no levels left
+@timed("start_round")
+def start_round(data, out):
+    metrics.round_started(data["level"])
+    if data["level"] > data["NUM_LEVELS"]:
+        if data["last_lev"]:
+            say(f'Forfeited. The word was: {data["sw"]}', out)
+        say("Congratulations! You've completed all the levels!", out)
+        say(f'Total Points: {data["tp"]} / {data["MAX_POINTS"] * data["NUM_LEVELS"]}', out)
+        say(f'Total Guesses: {data["tg"]}', out)
+        say(f'Total Hints Used: {data["th"]} (Hint Button)', out)
+        say(f'Total Letters Revealed: {data["total_letters_given"]} (Letter Reveal Button)', out)
+        say("To play again press restart", out)
+        return False
+  
+    prepared = get_round(data)
+    data["sw"] = prepared["sw"]
+    data["rp"] = data["MAX_POINTS"]
+    data["rg"] = 0
+    data["rh"] = 0
+    clear_guesses(data)
+    data["sv"] = prepared["sv"]
+    data["ss_list"] = prepared["ss_list"]
+    data["table"] = prepared["table"]
+    data["ladder"] = prepared["ladder"]
+    data["max_ss"] = 0
+    data["num_guess"] = 0
+    data["hinted_rows"] = set()
+    data["letters_given"] = 0
+    data["last_lev"] = False
+
+    # the next level's round is prepared while this one is being played
+    prefetch_round(data)
+
+    say("-" * 67, out)
+    say(f'Level {data["level"]}', out)
+    say("Start Guessing!!", out)
+    say("-" * 67, out)
+    return True
+
+# the first word of a guess that would get no vector (and score 0.0 against everything), or None
+# store words are checked with the spell index; with the model loaded a word the store doesn't have can still
+# have a vector (a vocab table lookup) or be split into tokens that do, like word_vector does, but nothing is scored
+def unknown_word(store, guess, nlp):
+    if store["spell"] is None or guess in store["index"]:
+        return None
+    for word in guess.split():
+        if is_word(store["spell"], store["words"], word):
+            continue
+        if nlp is not None and (nlp.vocab.has_vector(word) or len(nlp.tokenizer(word)) > 1):
+            continue
+        return word
+    return None
+
+# handles the user's guess 
+def play_round(guess, data, nlp, out):
+    guess = guess.lower()
+
+    # words without a vector are turned away with the closest store words instead of being scored (not a guess)
+    unknown = unknown_word(data["store"], guess, nlp)
+    if unknown is not None:
+        suggestions = suggest(data["store"]["spell"], data["store"]["words"], unknown)
+        if suggestions:
+            say(f"{unknown} isn't in the word list. Did you mean: {', '.join(suggestions)}?", out)
+        else:
+            say(f"{unknown} isn't in the word list", out)
+        return
+
+    if is_guessed(data, guess):
+        say("Already guessed", out)
+        return
+    else: 
+        mark_guessed(data, guess)
+        secret_word = data["sw"]
+        secret_vec = data["sv"]
+        max_ss = data["max_ss"]
+        ss_list = data["ss_list"]
+        round_hints = data["rh"]
+
+        if guess == secret_word.lower():
+            round_guesses = num_guessed(data)
+            round_points = data["rp"] 
+                
+            if round_points < 0:
+                round_points = 0
+
+            add_guess(data, out, guess, 1.0, 1)
+            say("Correct!", out)
+            say(f"Points Earned: {round_points} / {data['MAX_POINTS']}", out)
+            say(f"Number of Guesses: {round_guesses}", out) 
+            say(f"Number of Hints Used: {round_hints} (Hint Button)", out) 
+            say(f"Number of Letters Revealed: {data['letters_given']} (Letter Reveal Button)", out) 
+
+            data["rp"] = round_points
+            data["rg"] = round_guesses
+            data["tp"] += data["rp"]
+            data["tg"] += data["rg"]
+            data["th"] += data["rh"]
+            data["total_letters_given"] += data["letters_given"]
+            data["trc"] += 1
+            data["level"] += 1
+
+            return True, round_points, round_guesses, round_hints
+        else:
+            similarity = semantic_similarity(secret_vec, guess, data["store"], nlp, secret_word)
+            rank = guess_rank(data, guess, similarity)
+            # making feedback more user friendly by ensuring similarity isn't negative
+            if similarity < 0:
+                similarity = 0
+                
+            if similarity > 0.9999 and guess != secret_word.lower():
+                say("Almost there! That was practically a perfect match!", out)
+            else:        
+                add_guess(data, out, guess, similarity, rank)
+
+            if similarity > max_ss:
+                data["max_ss"] = similarity
+
+# if user hits the restart button after a game (the caller starts the first round again)
+def restart(data):
+    data["level"] = 1
+    data["tp"] = 0
+    data["tg"] = 0
+    data["th"] = 0
+    data["trc"] = 0
+
+# position of a word among the vocabulary sorted by similarity to the secret word (the secret word itself is #1)
+# vocabulary words are looked up directly, other guesses are placed by their score
+def guess_rank(data, word, ss):
+    table = data["table"]
+    i = data["store"]["index"].get(word)
+    if i is not None and i < len(table["ranks"]):
+        return int(table["ranks"][i])
+    return rank_of_score(table, ss)
+
+# scores a whole list of guesses against the current round's secret word in one vectorized pass
+# (for bots, replay tools and load tests that would otherwise call play_round once per guess)
+# nothing in data changes; already_guessed is True for words guessed earlier in the round or earlier in the list
+# similarities are shown the same way play_round shows them (never below 0) but ranks use the real score
+# guesses play_round would turn away (see unknown_word) aren't scored: known is False, similarity 0 and rank 0 (no rank)
+@timed("score_batch")
+def score_batch(guesses, data, nlp):
+    store = data["store"]
+    table = data["table"]
+    secret_word = data["sw"].lower()
+    guesses = [guess.strip().lower() for guess in guesses]
+
+    rows = np.array([store["index"].get(guess, -1) for guess in guesses], dtype=np.int64)
+    in_store = rows >= 0
+    in_vocab = in_store & (rows < len(table["ranks"]))
+    known = in_store.copy()
+    for i in np.flatnonzero(~in_store):
+        known[i] = unknown_word(store, guesses[i], nlp) is None
+    raw = np.zeros(len(guesses), dtype=np.float32)
+
+    # vocabulary words are already scored in the round's table (unless it came from the float16 all-pairs file),
+    # other words in the store are one gather and one matrix-vector product, and only the rest need lookup_vector
+    if data["pairs"] is None:
+        raw[in_vocab] = data["ss_list"][rows[in_vocab]]
+        gather = in_store & ~in_vocab
+    else:
+        gather = in_store
+    raw[gather] = row_scores(store, rows[gather], data["sv"])
+    for i in np.flatnonzero(known & ~in_store):
+        raw[i] = data["sv"] @ lookup_vector(store, guesses[i], nlp)
+
+    # vocabulary words already have a rank in the round's table, everything else is placed by binary search
+    ranks = len(table["sorted_ss"]) - np.searchsorted(table["sorted_ss"], raw, side="right") + 1
+    ranks[in_vocab] = table["ranks"][rows[in_vocab]]
+    ranks[~known] = 0
+
+    correct = np.array([guess == secret_word for guess in guesses], dtype=bool)
+    raw[correct] = 1.0
+    ranks[correct] = 1
+
+    # turned away guesses don't count as guessed, like in play_round
+    seen = guessed_words(data)
+    already_guessed = np.zeros(len(guesses), dtype=bool)
+    for i in np.flatnonzero(known):
+        already_guessed[i] = guesses[i] in seen
+        seen.add(guesses[i])
+
+    return {
+        "guesses": guesses,
+        "known": known,
+        "similarity": np.maximum(raw, 0),
+        "rank": ranks,
+        "already_guessed": already_guessed,
+        "correct": correct,
+    }
+
+# a word scoring between low and high (both excluded) from the round's ladder, as (word, ss), or None
+# the range is the positions [lo, hi) of the sorted table (two binary searches) and each band is a contiguous part of
+# it, so a band's weight is just its overlap with [lo, hi) and one random number picks a word uniformly from the range:
+#   - a band that lies entirely inside the range gives the next word of its shuffled list (a pop)
+#   - one of the (at most two) bands at the ends gives the picked position of its overlap directly
+# words given as hints always score at most max_ss (max_ss only goes up during a round and low is never below it),
+# so they can't be in the range and nothing has to be skipped; words scoring as high as the secret word (the secret
+# word itself, or a word with the same vector) are cut off the top of the range
+# the random number comes from the ladder's seed and the hint count, so the same round always gives the same hints
+# (to every player of a daily puzzle, and to a resumed game)
+def ladder_hint(data, low, high, excluded):
+    ladder = data["ladder"]
+    table = data["table"]
+    offsets = ladder["offsets"]
+    heads = ladder["heads"]
+    sorted_ss = table["sorted_ss"]
+    secret_pos = len(table["order"]) - int(table["ranks"][data["store"]["index"][data["sw"]]])
+    # the bounds are cast to the table's type first, a Python float would make searchsorted convert the whole table
+    lo = int(np.searchsorted(sorted_ss, sorted_ss.dtype.type(low), side="right"))
+    hi = min(int(np.searchsorted(sorted_ss, sorted_ss.dtype.type(high), side="left")), secret_pos)
+    if hi <= lo:
+        return None
+
+    first = int(np.searchsorted(offsets, lo, side="right")) - 1
+    last = int(np.searchsorted(offsets, hi - 1, side="right")) - 1
+    pick = random.Random(ladder["seed"] + data["rh"]).randrange(hi - lo)
+    for band in range(first, last + 1):
+        start = max(lo, int(offsets[band]))
+        end = min(hi, int(offsets[band + 1]))
+        if pick >= end - start:
+            pick -= end - start
+            continue
+        if start == offsets[band] and end == offsets[band + 1]:
+            pos = int(ladder["positions"][heads[band]])
+            heads[band] += 1
+        else:
+            pos = start + pick
+        return data["words_only"][table["order"][pos]], float(sorted_ss[pos])
+    return None
+
+# the same from the whole store through the ANN index (the hint can be any word the index was built on)
+def ann_hint(data, low, high, excluded):
+    store = data["store"]
+    rows, sims = ann_range(store["ann"], data["sv"], low, high)
+    candidates = [i for i in np.flatnonzero(sims > low) if store["words"][rows[i]] not in excluded]
+    if not candidates:
+        return None
+    i = random.choice(candidates)
+    return store["words"][rows[i]], float(sims[i])
+
+# the most similar word that isn't the secret word or a hint already given, as (word, ss), or None
+# walking down from the top of the sorted table only passes those words, so it is a few steps at most
+def table_closest(data, excluded):
+    table = data["table"]
+    secret_row = data["store"]["index"][data["sw"]]
+    closest = len(table["order"]) - 1
+    while closest >= 0 and (int(table["order"][closest]) == secret_row or int(table["order"][closest]) in data["hinted_rows"]):
+        closest -= 1
+    if closest < 0:
+        return None
+    return data["words_only"][table["order"][closest]], float(table["sorted_ss"][closest])
+
+def ann_closest(data, excluded):
+    store = data["store"]
+    rows, sims = ann_top_k(store["ann"], data["sv"], len(excluded) + 1)
+    for row, ss in zip(rows, sims):
+        if store["words"][row] not in excluded:
+            return store["words"][row], float(ss)
+    return None
+
+# Gives hints by revealing a word slightly more semantically similar to the secret word than previous guesses or hints
+# upper bound used for progressively easier hints 
+# hints come from the round's ladder, or through the ANN index when the store has one (see ann.py)
+@timed("hints")
+def hints(data, out):
+    if data["ladder"] is None and data["store"]["ann"] is None:
+        # a round resumed from a snapshot taken before every round had a ladder
+        data["ladder"] = round_ladder(data["table"])
+
+    upper_bound = data["max_ss"] + 0.2 * data["rh"]
+    if data["ladder"] is not None:
+        pick_hint, pick_closest = ladder_hint, table_closest
+    else:
+        pick_hint, pick_closest = ann_hint, ann_closest
+
+    # words that can't be given as a hint (the secret word and words already hinted)
+    excluded = {data["sw"], *(data["store"]["words"][row] for row in data["hinted_rows"])}
+    hint = pick_hint(data, data["max_ss"], upper_bound, excluded)
+
+    while hint is None: 
+        upper_bound += 0.05 
+        if upper_bound >= 1: 
+            closest = pick_closest(data, excluded)
+            if closest is not None and closest[1] > data["max_ss"]: 
+                data["max_ss"] = closest[1]
+                say(f"Closest Word: {closest[0]}", out) 
+            else: 
+                say("No more hints available", out)
+            return
+                        
+        else:
+            hint = pick_hint(data, data["max_ss"] + 0.1, upper_bound, excluded)
+                                
+    hint_word, hint_ss = hint
+    data["hinted_rows"].add(data["store"]["index"][hint_word])
+    data["max_ss"] = hint_ss
+    data["rh"] += 1
+    data["rp"] -= HINT_PENALTY
+    if data["rp"] < 0:
+        data["rp"] = 0
+
+    say(f"Hint:\n", out)
+    add_guess(data, out, hint_word, hint_ss, guess_rank(data, hint_word, hint_ss))
+
+# reveals one more letter from the secret word and avoids revealing the whole word 
+def letter_reveal(data, out): 
+    given = data["letters_given"]
+
+    if given >= len(data["sw"]) - 2:
+        say("No more letter reveal hints available for this round", out)
+
+    else:
+        given += 1
+        data["letters_given"] = given
+        letters = data["sw"][:given]
+        remain = len(data["sw"]) - given
+        data["rp"] -= REVEAL_PENALTY
+        if data["rp"] < 0:
+            data["rp"] = 0
+    
+        say(f'Letter Reveal: {letters + "_ " * remain}', out)
+
+# gives up on the current round and reveals the secret word (the caller starts the next round)
+def forfeit(data, out):
+    if data["level"] == data["NUM_LEVELS"]:
+        data["last_lev"] = True
+    else:
+        say(f'Forfeited. The word was: {data["sw"]}', out)
+        data["last_lev"] = False
+
+    data["rp"] = 0
+    data["rg"] = 0
+    data["level"] += 1
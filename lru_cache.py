@@ -0,0 +1,74 @@
+"""
+Size-bounded LRU cache for Semantic Search Party
+
+Players guess the same common words over and over, so the unit vector of every guess that had to
+come from the model (and, optionally, every (secret word, guess) score) is kept in a cache that
+forgets the least recently used entries once it holds more than max_bytes.
+
+The cache is a dictionary like the rest of the game's state. Every function takes its lock,
+so one cache can be shared by every game in the process (the server's games all use the same one).
+"""
+
+
+import threading
+from collections import OrderedDict
+
+ENTRY_OVERHEAD = 120        # rough bytes of Python bookkeeping per entry (key object, tuple, dict slot)
+FLOAT_BYTES = 24            # size of a Python float (sys.getsizeof(1.0)), a cached score's value
+
+
+def make_cache(max_bytes):
+    return {
+        "items": OrderedDict(),     # key -> (value, bytes), least recently used first
+        "bytes": 0,
+        "max_bytes": max_bytes,
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+        "lock": threading.Lock(),
+    }
+
+# the cached value (and marks it as recently used), or None if it isn't cached
+def cache_get(cache, key):
+    with cache["lock"]:
+        entry = cache["items"].get(key)
+        if entry is None:
+            cache["misses"] += 1
+            return None
+        cache["items"].move_to_end(key)
+        cache["hits"] += 1
+        return entry[0]
+
+# adds a value (nbytes is the size of the value, keys are strings or tuples of strings)
+# and forgets the least recently used values until the cache fits in max_bytes again
+def cache_put(cache, key, value, nbytes):
+    if isinstance(key, tuple):
+        nbytes += sum(len(part) for part in key) + ENTRY_OVERHEAD
+    else:
+        nbytes += len(key) + ENTRY_OVERHEAD
+    with cache["lock"]:
+        if nbytes > cache["max_bytes"]:
+            return
+        old = cache["items"].pop(key, None)
+        if old is not None:
+            cache["bytes"] -= old[1]
+        cache["items"][key] = (value, nbytes)
+        cache["bytes"] += nbytes
+
+        while cache["bytes"] > cache["max_bytes"]:
+            old_key, (old_value, old_bytes) = cache["items"].popitem(last=False)
+            cache["bytes"] -= old_bytes
+            cache["evictions"] += 1
+
+def cache_stats(cache):
+    with cache["lock"]:
+        lookups = cache["hits"] + cache["misses"]
+        return {
+            "items": len(cache["items"]),
+            "bytes": cache["bytes"],
+            "max_bytes": cache["max_bytes"],
+            "hits": cache["hits"],
+            "misses": cache["misses"],
+            "evictions": cache["evictions"],
+            "hit_rate": cache["hits"] / lookups if lookups else 0.0,
+        }
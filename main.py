@@ -13,12 +13,33 @@ Features:
         - Used spaCy to get the scores
             - Imported a spaCy pretrained model that includes word vectors
             - spaCy gets the similarity score by comparing those word vectors using cosine similarity
+        - Every vocabulary vector is stacked into one normalized NumPy matrix at startup (embeddings.py)
+            - a round's whole similarity table is one matrix-vector product instead of one spaCy call per word
+        - Each guess shows its rank among all vocabulary words, like Contexto
+        - Single-word guesses are scored from nlp.vocab vectors directly, skipping the spaCy pipeline
+        - Optional fast-start bundle (bundle.py) so the game starts without loading spaCy or wordfreq
+            - build it once with: python main.py build-bundle [float16|int8|float32]
+            - the vectors are stored as float16 (or int8) and scored without a float32 copy
+        - Optional precomputed all-pairs similarity table (all_pairs.py) that is memory-mapped from disk
+            - build it once with: python all_pairs.py
+        - Optional approximate nearest-neighbour index (ann.py) so hints can come from every word in the bundle
+            - build it once with: python ann.py build
+    - Daily puzzles (daily.py): the same secret words and hints for everyone on the same date, computed ahead of time
+        - build a year of them with: python daily.py, play today's with: python main.py daily
     - tkinter GUI
+        - the game logic itself is in game.py and doesn't use tkinter
+        - tkinter and tkmacosx are only imported when the window opens (without tkmacosx the buttons are plain tkinter ones)
+        - python main.py --headless plays the same game in a terminal, without a display
+        - game actions run on a worker thread and their results come back through a queue, so the window never freezes
+        - output is drawn in batches once per frame, the guess log is capped, and a best guesses view is kept sorted as guesses come in
+    - Optional timing metrics and single-round profiling (metrics.py), switched on with SSP_METRICS=1
+    - Headless game server (server.py) that runs many players' games against one shared set of word vectors
     - Hints and letter reveal buttons to improve user experience
     - Points system based on user performance 
 
 Libraries:
     - spaCy with the model en_core_web_lg to get semantic similarity
+    - NumPy for the embedding matrix and the round's similarity table
     - wordfreq to determine how common a word is and use that score (higher score meaning more common) to sort level difficulty
     - tkinter for visuals
     - tkmacosx to solve tkinter button widgets' issues on macOS
@@ -41,97 +62,148 @@ Note: this program uses Python 3.11 because it is more compatible with spacy
 """
 
 
-from wordfreq import word_frequency
-import random 
-import spacy  
-import en_core_web_lg
-import tkinter as tk
-from tkmacosx import Button
-
-# getting word frequencies from a list of words
-def get_freq():
-    words_only = []
-    with open("cleaned_word_list.txt", "r") as word_list:
-        word_list.readline()
-        for line in word_list:
-            word = line.strip()
-            words_only.append(word)    
-
-    word_freq_list = []
-    for word in words_only:
-        freq = word_frequency(word, 'en', wordlist='best', minimum=0.0)
-        word_freq_list.append((word, freq))
-    return word_freq_list, words_only
-
-#scaling frequencies to be between 0 and 1
-def scale(word_freq_list):
-    freqs = []
-    for word, freq in word_freq_list:
-        freqs.append(freq)
-
-    max_freq = max(freqs)
-    min_freq = min(freqs)
-    scaled_freqs = []
-    
-    for word, freq in word_freq_list:
-        scaled_freq = (freq - min_freq) / (max_freq - min_freq)
-        scaled_freqs.append((scaled_freq, word))
-    return scaled_freqs
-
-# adding in the length of each word as a factor that determines the difficulty level
-def difficulty_score(scaled_freqs):
-    max_len = 0
-    for freq, word in scaled_freqs:
-        if len(word) > max_len:
-            max_len = len(word)
-
-    scores = []
-    for freq, word in scaled_freqs:
-        difficulty = (1 - freq) + (len(word) / max_len)
-        scores.append((difficulty, word))
-    return scores
-
-# sorts the words into levels corresponding to their difficulty based on the number of total levels in the game
-def make_bins(scores, NUM_LEVELS):
-    sorted_words = sorted(scores)
-    bin_size = len(sorted_words) // NUM_LEVELS
-    bin_dict = {}
-    for i in range(NUM_LEVELS):
-        if i == NUM_LEVELS - 1:
-            words_in_bin = sorted_words[i * bin_size:]
+import bisect
+import datetime
+import queue
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import game
+import metrics
+from metrics import timed
+from game import load_model, get_freq, scale, difficulty_score, make_bins
+
+POLL_MS = 16                # how often the window checks for finished game actions (about one frame)
+FRAME_SECONDS = 0.012       # longest one check spends drawing results before letting the window repaint
+MAX_LOG_LINES = 300         # guess log lines kept in the output box, older ones are trimmed from the top
+BEST_SIZE = 10              # guesses shown in the best guesses view
+
+# tkinter and tkmacosx are imported by load_tk when the window opens, so --headless runs without a display
+tk = None
+Button = None
+
+def load_tk():
+    global tk, Button
+    import tkinter as tk
+    try:
+        from tkmacosx import Button
+    except ImportError:
+        # tkmacosx only fixes button colors on macOS, everywhere else tkinter's own buttons look the same
+        Button = tk.Button
+
+# shows everything the game logic wanted the player to see (see game.py for the two kinds of lines)
+# the whole batch goes in with one insert, and the box is unlocked, trimmed and scrolled once per batch instead of once per line
+@timed("show")
+def show(out, data, output_box):
+    if not out:
+        return
+    chunks = []
+    for line in out:
+        if line[0] == "text":
+            chunks += [line[1].strip() + "\n", ()]
         else:
-            words_in_bin = sorted_words[i * bin_size : (i + 1) * bin_size]
-
-        word_list = []
-        for w in words_in_bin:
-            word_list.append(w[1])
-        bin_dict[i + 1] = word_list
-    return bin_dict
-
-# choosing a word based on the difficulty of the current level
-def choose_word(bin_dict, level):
-    word = random.choice(bin_dict[level])
-    return word
-
-# using spacy to get similarity scores
-def semantic_similarity(doc1, guess, nlp):
-    doc2 = nlp(guess)
-    if doc1.has_vector and doc2.has_vector:
-        return doc1.similarity(doc2)
-    else: 
-        return 0.0 
-
-#made a function to print to the GUI because tkinter doesn't use the typical text based print()
-def tk_print(msg, output_box):
-    msg = msg.strip()
+            chunks += guess_row(*line[1:])
+            add_best(data, *line[1:])
+
     output_box.configure(state="normal")
-    output_box.insert(tk.END, msg + "\n")
+    output_box.insert(tk.END, *chunks)
+    trim_log(output_box)
     output_box.see(tk.END)
     output_box.configure(state="disabled")
 
-
-# resetting game stats and visuals for a new round, printing stats if game over
+# keeps at most MAX_LOG_LINES lines after the log_start mark (the title and the round's intro above it stay)
+def trim_log(output_box):
+    start = int(output_box.index("log_start").split(".")[0])
+    end = int(output_box.index("end-1c").split(".")[0])
+    extra = end - start - MAX_LOG_LINES
+    if extra > 0:
+        output_box.delete(f"{start}.0", f"{start + extra}.0")
+
+# the best guesses view is a sorted list of (-similarity, guess number, word) kept in step with best_box:
+# a new guess is inserted at its place with one insert and the row that falls off the bottom is deleted,
+# so the view is never redrawn
+def add_best(data, num_guess, word, ss, rank, num_words):
+    best = data["best"]
+    entry = (-ss, num_guess, word)
+    pos = bisect.bisect(best, entry)
+    if pos >= BEST_SIZE or any(old[2] == word for old in best):
+        return
+    best.insert(pos, entry)
+
+    best_box = data["best_box"]
+    best_box.configure(state="normal")
+    best_box.insert(f"{pos + 1}.0", f"#{rank}\t{word}\t{ss:.2f}\n", similarity_color(ss))
+    if len(best) > BEST_SIZE:
+        best.pop()
+        best_box.delete(f"{BEST_SIZE + 1}.0", tk.END)
+    best_box.configure(state="disabled")
+
+def reset_best(data):
+    data["best"] = []
+    data["best_box"].configure(state="normal")
+    data["best_box"].delete("1.0", tk.END)
+    data["best_box"].configure(state="disabled")
+
+
+# game actions run on one worker thread (in the order they were asked for) so the window keeps repainting
+# while a round's table is scored, finished work comes back through data["results"], which poll() checks every frame
+# forfeit and restart make every earlier request stale: requests that haven't started are cancelled and
+# the results of one that was already running are dropped when they arrive
+def submit(data, action, done=None):
+    generation = data["generation"]
+
+    def work():
+        out = []
+        try:
+            result = action(out)
+        except Exception as error:
+            data["results"].put((generation, out, None, None, error))
+            return
+        data["results"].put((generation, out, result, done, None))
+
+    data["requests"].append(data["worker"].submit(work))
+    data["status_label"].configure(text="thinking…")
+
+def cancel_stale(data, output_box):
+    data["generation"] += 1
+    for request in data["requests"]:
+        request.cancel()
+    if data["round_timer"] is not None:
+        output_box.after_cancel(data["round_timer"])
+        data["round_timer"] = None
+
+# shows finished work on the UI thread, stopping after about one frame's worth of drawing so input is never held up
+# lines from every result in this frame are shown as one batch (a result's callback still runs after its own lines)
+def poll(data, output_box):
+    deadline = time.perf_counter() + FRAME_SECONDS
+    lines = []
+    while time.perf_counter() < deadline:
+        try:
+            generation, out, result, done, error = data["results"].get_nowait()
+        except queue.Empty:
+            break
+        if generation != data["generation"]:
+            continue
+        if error is not None:
+            traceback.print_exception(error)
+            continue
+        lines += out
+        if done is not None:
+            show(lines, data, output_box)
+            lines = []
+            done(result)
+    show(lines, data, output_box)
+
+    data["requests"] = [request for request in data["requests"] if not request.done()]
+    if not data["requests"] and data["results"].empty():
+        data["status_label"].configure(text="")
+    output_box.after(POLL_MS, lambda: poll(data, output_box))
+
+
+# resetting visuals for a new round, printing stats if game over
 def start_round(data, nlp, output_box, frame):
+    data["round_timer"] = None
     if "restart_button" in data and data["restart_button"]:
         data["restart_button"].destroy()
         data["restart_button"] = None
@@ -143,170 +215,26 @@ def start_round(data, nlp, output_box, frame):
     output_box.tag_configure("title",font=("Times New Roman", 30, "bold"), foreground="white")
     output_box.insert(tk.END, "\n")
     output_box.delete("3.0", tk.END)
+    output_box.mark_set("log_start", "3.0")
     output_box.configure(state="disabled")
-    
-    if data["level"] > data["NUM_LEVELS"]:
-        if data["last_lev"]:
-            tk_print(f'Forfeited. The word was: {data["sw"]}', output_box)
-        tk_print("Congratulations! You've completed all the levels!", output_box)
-        tk_print(f'Total Points: {data["tp"]} / {data["MAX_POINTS"] * data["NUM_LEVELS"]}', output_box)
-        tk_print(f'Total Guesses: {data["tg"]}', output_box)
-        tk_print(f'Total Hints Used: {data["th"]} (Hint Button)', output_box)
-        tk_print(f'Total Letters Revealed: {data["total_letters_given"]} (Letter Reveal Button)', output_box)
-        tk_print("To play again press restart", output_box)
-  
-        restart_button = Button(frame, text="Restart Game", bg="green", fg="white", font=("Times New Roman", 14), command=lambda: restart(data, nlp, output_box, frame))
-        restart_button.grid(row=3, column=0, columnspan=4, sticky="nsew", pady=5, padx=5)
-        data["restart_button"] = restart_button
-        return
-  
-    data["sw"] = choose_word(data["bins"], data["level"])
-    data["rp"] = data["MAX_POINTS"]
-    data["rg"] = 0
-    data["rh"] = 0
-    data["already_guessed"] = set()
-    data["doc1"] = nlp(data["sw"])
-    data["max_ss"] = 0
-    data["ss_list"] = []
-    data["num_guess"] = 0
-    data["hints_given"] = set()
-    data["letters_given"] = 0
-    data["restart_button"] = None
-    data["last_lev"] = False
-
-
-    for word in data["words_only"]:
-        ss = semantic_similarity(data["doc1"], word, nlp)
-        data["ss_list"].append([word, ss])        
-
-    tk_print("-" * 67, output_box)
-    guess_entry.bind("<Return>", lambda e: on_guess(data, nlp, output_box, guess_entry, frame))
-     
-    tk_print(f'Level {data["level"]}', output_box)
-    tk_print("Start Guessing!!", output_box)
-    tk_print("-" * 67, output_box)
-    box(output_box)
-
-# handles the user's guess 
-def play_round(guess, data, nlp, output_box):
-    guess = guess.lower()
-
-    if guess in data["already_guessed"]:
-        tk_print("Already guessed", output_box)
-        return
-    else: 
-        data["already_guessed"].add(guess)
-        secret_word = data["sw"]
-        doc1 = data["doc1"]
-        max_ss = data["max_ss"]
-        ss_list = data["ss_list"]
-        round_hints = data["rh"]
-
-        if guess == secret_word.lower():
-            round_guesses = len(data["already_guessed"])
-            round_points = data["rp"] 
-                
-            if round_points < 0:
-                round_points = 0
-
-            add_guess(data, output_box, guess, 1.0)
-            tk_print("Correct!", output_box)
-            tk_print(f"Points Earned: {round_points} / {data['MAX_POINTS']}", output_box)
-            tk_print(f"Number of Guesses: {round_guesses}", output_box) 
-            tk_print(f"Number of Hints Used: {round_hints} (Hint Button)", output_box) 
-            tk_print(f"Number of Letters Revealed: {data['letters_given']} (Letter Reveal Button)", output_box) 
-
-            data["rp"] = round_points
-            data["rg"] = round_guesses
-            data["tp"] += data["rp"]
-            data["tg"] += data["rg"]
-            data["th"] += data["rh"]
-            data["total_letters_given"] += data["letters_given"]
-            data["trc"] += 1
-            data["level"] += 1
-
-            return True, round_points, round_guesses, round_hints
-        else:
-            similarity = semantic_similarity(doc1, guess, nlp)
-            # making feedback more user friendly by ensuring similarity isn't negative
-            if similarity < 0:
-                similarity = 0
-                
-            if similarity > 0.9999 and guess != secret_word.lower():
-                tk_print("Almost there! That was practically a perfect match!", output_box)
-            else:        
-                add_guess(data, output_box, guess, similarity)
-
-            if similarity > max_ss:
-                data["max_ss"] = similarity
+    reset_best(data)
+
+    def round_started(started):
+        if not started:
+            restart_button = Button(frame, text="Restart Game", bg="green", fg="white", font=("Times New Roman", 14), command=lambda: restart(data, nlp, output_box, frame))
+            restart_button.grid(row=3, column=0, columnspan=4, sticky="nsew", pady=5, padx=5)
+            data["restart_button"] = restart_button
+            return
+
+        guess_entry.bind("<Return>", lambda e: on_guess(data, nlp, output_box, guess_entry, frame))
+        box(output_box)
+
+    submit(data, lambda out: game.start_round(data, out), round_started)
 
 # if user hits the restart button after a game
 def restart(data, nlp, output_box, frame):
-    data["level"] = 1
-    data["tp"] = 0
-    data["tg"] = 0
-    data["th"] = 0
-    data["trc"] = 0
-    start_round(data, nlp, output_box, frame)
-
-# Gives hints by revealing a word slightly more semantically similar to the secret word than previous guesses or hints
-# upper bound used for progressively easier hints 
-def hints(data, output_box):
-    upper_bound = data["max_ss"] + 0.2 * data["rh"]
-        
-    candidates = [] 
-    for word, ss in data["ss_list"]: 
-        if word != data["sw"] and ss > data["max_ss"] and ss < upper_bound and word not in data["hints_given"]:
-            candidates.append([word, ss]) 
-
-    while len(candidates) == 0: 
-        upper_bound += 0.05 
-        if upper_bound >= 1: 
-            for word, ss in data["ss_list"]: 
-                if ss > data["max_ss"]: 
-                    max_word = word 
-                    data["max_ss"] = ss 
-                    tk_print(f"Closest Word: {max_word}", output_box) 
-                    return 
-                else: 
-                    tk_print("No more hints available", output_box)
-                    return
-                        
-        else:
-            for word, ss in data["ss_list"]: 
-                if ss > data["max_ss"] + 0.1 and ss < upper_bound: 
-                    candidates.append([word, ss]) 
-                                
-    hint = random.choice(candidates) 
-    hint_word = hint[0] 
-    hint_ss = hint[1] 
-    data["hints_given"].add(hint_word)
-    data["max_ss"] = hint_ss
-    data["rh"] += 1
-    data["rp"] -= 5
-    if data["rp"] < 0:
-        data["rp"] = 0
-
-    tk_print(f"Hint:\n", output_box)
-    add_guess(data, output_box, hint_word, hint_ss)
-
-# reveals one more letter from the secret word and avoids revealing the whole word 
-def letter_reveal(data, output_box): 
-    given = data["letters_given"]
-
-    if given >= len(data["sw"]) - 2:
-        tk_print("No more letter reveal hints available for this round", output_box)
-
-    else:
-        given += 1
-        data["letters_given"] = given
-        letters = data["sw"][:given]
-        remain = len(data["sw"]) - given
-        data["rp"] -= 10
-        if data["rp"] < 0:
-            data["rp"] = 0
-    
-        tk_print(f'Letter Reveal: {letters + "_ " * remain}', output_box)
+    cancel_stale(data, output_box)
+    submit(data, lambda out: game.restart(data), lambda result: start_round(data, nlp, output_box, frame))
 
 def on_guess(data, nlp, output_box, guess_entry, frame):
     guess = guess_entry.get().strip()
@@ -314,58 +242,89 @@ def on_guess(data, nlp, output_box, guess_entry, frame):
         return
     
     guess_entry.delete(0, tk.END)   
-    result = play_round(guess, data, nlp, output_box) 
-   
-    if result and result[0] is True: 
-        output_box.after(9000, lambda: start_round(data, nlp, output_box, frame)) # pause to show round stats before new round starts
+
+    def guessed(result):
+        if result and result[0] is True: 
+            data["round_timer"] = output_box.after(9000, lambda: start_round(data, nlp, output_box, frame)) # pause to show round stats before new round starts
+
+    submit(data, lambda out: game.play_round(guess, data, nlp, out), guessed)
 
 
 
 def on_hint(data, nlp, output_box):
-    hints(data, output_box)
+    submit(data, lambda out: game.hints(data, out))
+
+def on_reveal(data, output_box):
+    submit(data, lambda out: game.letter_reveal(data, out))
 
 # reveals secret word when user hits forfeit button and pauses briefly to show the answer
 def on_forfeit(data, nlp, output_box, frame):
-    if data["level"] == data["NUM_LEVELS"]:
-        data["last_lev"] = True
-    else:
-        tk_print(f'Forfeited. The word was: {data["sw"]}', output_box)
-        data["last_lev"] = False
-
-    data["rp"] = 0
-    data["rg"] = 0
-    data["level"] += 1
-    output_box.after(100, lambda: start_round(data, nlp, output_box, frame))
+    cancel_stale(data, output_box)
+    submit(data, lambda out: game.forfeit(data, out), lambda result: output_box.after(100, lambda: start_round(data, nlp, output_box, frame)))
 
 
+# the header of the guess log, everything after it can be trimmed
 def box(output_box):
     output_box.configure(state="normal")
-    topic = "#\tGuess\tSimilarity\n"
+    topic = "#\tGuess\tSimilarity\tRank\n"
     output_box.insert("end", topic)
     output_box.insert("end", "-" * 67 + "\n")
+    output_box.mark_set("log_start", "end-1c")
     output_box.configure(state="disabled")
 
-# Inserts the guess and feedback into the output box
-def add_guess(data, output_box, word, ss):
-    data["num_guess"] += 1
-    num_guess = data["num_guess"]
-
-    output_box.configure(state="normal")
-
+def similarity_color(ss):
     if ss < 0.33:
-        color = "red"
+        return "red"
     elif ss < 0.66:
-        color = "orange"
-    else:
-        color = "green"
-
-    if color not in output_box.tag_names():
-        output_box.tag_configure(color, foreground=color)
-
-    row_txt = f"{num_guess}\t{word.strip()}\t{ss:.2f}\n"
-    output_box.insert("end", row_txt, color)
-    output_box.configure(state="disabled")
-    output_box.see("end")
+        return "orange"
+    return "green"
+
+# text and color tag of one guess in the log
+# rank is the guess's place among all num_words vocabulary words like Contexto shows it (#1 is the secret word)
+def guess_row(num_guess, word, ss, rank, num_words):
+    return [f"{num_guess}\t{word}\t{ss:.2f}\t#{rank} of {num_words:,}\n", similarity_color(ss)]
+
+# prints the game's output lines in a terminal (guess rows like the window's log, without the colors)
+def print_out(out):
+    for line in out:
+        if line[0] == "text":
+            print(line[1])
+        else:
+            print(guess_row(*line[1:])[0], end="")
+
+# the game without a window: each line typed is a guess, or one of the commands for the buttons
+def play_headless(data, nlp):
+    print("SEMANTIC SEARCH PARTY (type a guess, or :hint, :reveal, :forfeit, :restart, :quit)")
+    out = []
+    playing = game.start_round(data, out)
+    print_out(out)
+    while True:
+        try:
+            guess = input("> ").strip()
+        except EOFError:
+            break
+        out = []
+        if guess == ":quit":
+            break
+        elif guess == ":restart":
+            game.restart(data)
+            playing = game.start_round(data, out)
+        elif not guess:
+            continue
+        elif not playing:
+            print("The game is over, type :restart to play again or :quit")
+        elif guess == ":hint":
+            game.hints(data, out)
+        elif guess == ":reveal":
+            game.letter_reveal(data, out)
+        elif guess == ":forfeit":
+            game.forfeit(data, out)
+            playing = game.start_round(data, out)
+        else:
+            result = game.play_round(guess, data, nlp, out)
+            if result and result[0] is True:
+                playing = game.start_round(data, out)
+        print_out(out)
 
 # for placeholder text in entry box
 def temp_msg(entry, msg):
@@ -385,40 +344,55 @@ def temp_msg(entry, msg):
 
 
 if __name__ == "__main__":  
-    nlp = en_core_web_lg.load()
     NL = 3
     MP = 100
-    word_freq_list, words_only = get_freq()
-    bins = make_bins(difficulty_score(scale(word_freq_list)), NL)
-
-    # decided to use a dictionary for game stats because function calls were getting messy 
-    data = {
-        "NUM_LEVELS": NL,
-        "MAX_POINTS": MP,
-        "level": 1,
-        "tp": 0,        # total points
-        "tg": 0,        # total guesses
-        "th": 0,        # total hints used
-        "trc": 0,       # total rounds completed
-        "rp": 0,        # current round points
-        "rg": 0,        # current round guesses
-        "rh": 0,        # current round hints used
-        "already_guessed": set(),       # tracking words already guessed in the round
-        "sw": "",       # current secret word
-        "doc1": 0,      # current secret word spacy doc
-        "max_ss": 0,        # max semantic similarity score in current round
-        "ss_list": [],      # list of (word, similarity) tuples 
-        "bins": bins,       # words per difficulty level
-        "words_only": words_only,       # all words in dataset
-        "hints_given": set(),       # words given as hints
-        "letters_given": 0,         # num letters revealed
-        "total_letters_given": 0,
-        "num_guess": 0,         # sequential number for display of each guess
-        "restart_button": None,         # whether restart button has been pressed or not
-        "last_lev": False,      # True when last level reached     
-    }
+    headless = "--headless" in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != "--headless"]
+
+    # python main.py build-bundle [dtype] writes the fast-start bundle and exits
+    if args and args[0] == "build-bundle":
+        from bundle import BUNDLE_FILE, BUNDLE_DTYPE, build_bundle
+
+        dtype = args[1] if len(args) > 1 else BUNDLE_DTYPE
+        nlp = load_model()
+        freqs, words_only = get_freq()
+        scores = difficulty_score(scale(freqs), words_only)
+        num_words, report = build_bundle(BUNDLE_FILE, nlp, freqs, words_only, scores, make_bins(words_only, scores, NL), dtype=dtype)
+        print(f"Wrote {BUNDLE_FILE} with {len(words_only)} game words and {num_words} {dtype} word vectors")
+        print(f"Vectors: {report['mb']} MB instead of {report['float32_mb']} MB as float32")
+        print(f"Score error against float32: max {report['max_abs_error']:.5f}, mean {report['mean_abs_error']:.6f}")
+        print(f"Top 10 words unchanged: {report['top10_overlap']:.1%}, average rank shift: {report['mean_rank_shift']:.2f}")
+        sys.exit()
+
+    metrics.start_dump()
+    nlp, words_only, bins, store, pairs = game.load_resources(NL)
+
+    data = game.new_game(NL, MP, words_only, bins, store, pairs, ThreadPoolExecutor(max_workers=1))
+
+    # python main.py daily [date] plays the precomputed puzzle of the day (see daily.py)
+    if args and args[0] == "daily":
+        from daily import open_day
+
+        date = args[1] if len(args) > 1 else datetime.date.today().isoformat()
+        data["daily"] = open_day(date, words_only, NL)
+        if data["daily"] is None:
+            sys.exit(f"There is no daily puzzle for {date}, build it with: python daily.py {date}")
+
+    # python main.py --headless [daily [date]] plays in the terminal
+    if headless:
+        play_headless(data, nlp)
+        data["executor"].shutdown(wait=False, cancel_futures=True)
+        sys.exit()
+
+    data["restart_button"] = None         # whether restart button has been pressed or not
+    data["worker"] = ThreadPoolExecutor(max_workers=1)       # runs the game actions off the UI thread (see submit)
+    data["results"] = queue.Queue()       # (generation, out, result, done, error) from finished game actions
+    data["requests"] = []                 # game actions that haven't finished yet
+    data["generation"] = 0                # goes up on forfeit and restart so older results are ignored
+    data["round_timer"] = None            # the pending start of the next round after a correct guess
     
     # tkinter window 
+    load_tk()
     root = tk.Tk()
     root.title("Semantic Search Party") 
     root.configure(bg="navy")
@@ -437,7 +411,21 @@ if __name__ == "__main__":
     output_box = tk.Text(frame, width=50, height=15, bg="black", fg="white", font=("Times New Roman", 18), selectbackground="purple", selectforeground="white")
     output_box.grid(row=0, column=0, columnspan=4, sticky="nsew")
     output_box.configure(state="disabled")
-    output_box.configure(tabs=("60p", "250p")) # for column alignment
+    output_box.configure(tabs=("60p", "250p", "380p")) # for column alignment
+    output_box.mark_set("log_start", "1.0")
+    output_box.mark_gravity("log_start", "left")      # stays in front of text inserted at the mark
+    for color in ("red", "orange", "green"):
+        output_box.tag_configure(color, foreground=color)
+
+    best_frame = tk.LabelFrame(frame, text="Best guesses", bg="navy", fg="white", font=("Times New Roman", 14))
+    best_frame.grid(row=0, column=4, sticky="nsew", padx=(10, 0))
+    best_box = tk.Text(best_frame, width=24, height=BEST_SIZE, bg="black", fg="white", font=("Times New Roman", 16), tabs=("50p", "200p"))
+    best_box.pack(fill="both", expand=True)
+    best_box.configure(state="disabled")
+    for color in ("red", "orange", "green"):
+        best_box.tag_configure(color, foreground=color)
+    data["best_box"] = best_box
+    data["best"] = []
 
 
     guess_entry = tk.Entry(frame,bg="white", fg="black", font=("Times New Roman", 18), insertbackground="black")
@@ -457,11 +445,18 @@ if __name__ == "__main__":
     quit_button = Button(frame, text="Quit", bg="red", fg="white", font=("Times New Roman", 14), activebackground="darkred", activeforeground="white", highlightbackground="red", highlightthickness=1,command=root.destroy, width=10)
     quit_button.grid(row=2, column=3, sticky="ew", padx=5, pady=5) 
 
-    reveal_button = Button(frame, text="Reveal Letter (-10)", bg="green", fg="white", font=("Times New Roman", 14), activebackground="darkgreen", activeforeground="white", highlightbackground="green", highlightthickness=1, command=lambda: letter_reveal(data, output_box), width=10)
+    reveal_button = Button(frame, text="Reveal Letter (-10)", bg="green", fg="white", font=("Times New Roman", 14), activebackground="darkgreen", activeforeground="white", highlightbackground="green", highlightthickness=1, command=lambda: on_reveal(data, output_box), width=10)
     reveal_button.grid(row=2, column=1, sticky="ew", padx=5, pady=5)
 
+    status_label = tk.Label(frame, text="", bg="navy", fg="white", font=("Times New Roman", 12))
+    status_label.grid(row=4, column=0, columnspan=4, sticky="w", padx=5)
+    data["status_label"] = status_label
+
     start_round(data, nlp, output_box, frame)
+    poll(data, output_box)
     root.mainloop()
+    data["worker"].shutdown(wait=False, cancel_futures=True)
+    data["executor"].shutdown(wait=False, cancel_futures=True)
 
     
 
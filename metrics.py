@@ -0,0 +1,159 @@
+"""
+Timing metrics for Semantic Search Party
+
+When someone says "the game froze" this shows which part was slow: loading the model, looking up
+frequencies, making the level bins, starting a round, scoring a guess, finding a hint or drawing a guess.
+
+Functions are wrapped with @timed("name"), and every call adds its time to a histogram for that name.
+Metrics are off unless the SSP_METRICS environment variable is set when the game starts. When they
+are off, @timed returns the function unchanged, so the game runs exactly the same code as without it.
+
+Ways to read the numbers:
+    - prometheus_text(): Prometheus text format (the server answers GET /metrics with it)
+    - SSP_METRICS_FILE=metrics.json writes json_snapshot() to that file every SSP_METRICS_EVERY seconds (default 10)
+
+Profiling one round: SSP_PROFILE_ROUND=2 runs cProfile and tracemalloc from the start of level 2 until
+the next round starts, then writes round_2.prof (open it with python -m pstats) and round_2_memory.txt.
+cProfile only sees the thread that started it, so that level's round isn't prefetched: it is prepared when
+it starts, on the profiled thread.
+
+Example: SSP_METRICS=1 SSP_METRICS_FILE=metrics.json python main.py
+"""
+
+
+import functools
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("SSP_METRICS", "") not in ("", "0")
+PROFILE_LEVEL = int(os.environ.get("SSP_PROFILE_ROUND", "0") or 0)
+
+# upper edges of the histogram buckets in seconds (from 10 microseconds up to 10 seconds)
+BUCKETS = [0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0]
+
+spans = {}      # name -> {"count", "sum", "max", "buckets"}
+spans_lock = threading.Lock()
+profiling = {"level": None, "profiler": None, "done": False}
+
+
+# adds one call's time to a span's histogram
+def record(name, seconds):
+    with spans_lock:
+        span = spans.get(name)
+        if span is None:
+            span = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * (len(BUCKETS) + 1)}
+            spans[name] = span
+        span["count"] += 1
+        span["sum"] += seconds
+        span["max"] = max(span["max"], seconds)
+
+        bucket = 0
+        while bucket < len(BUCKETS) and seconds > BUCKETS[bucket]:
+            bucket += 1
+        span["buckets"][bucket] += 1
+
+# decorator that times every call to a function (does nothing at all if metrics are off)
+def timed(name):
+    def wrap(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def timed_fn(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return timed_fn
+    return wrap
+
+def json_snapshot():
+    with spans_lock:
+        snapshot = {}
+        for name, span in spans.items():
+            snapshot[name] = {
+                "count": span["count"],
+                "total_ms": round(span["sum"] * 1000, 3),
+                "mean_ms": round(span["sum"] * 1000 / span["count"], 4),
+                "max_ms": round(span["max"] * 1000, 3),
+                "buckets_ms": {f"{edge * 1000:g}": count for edge, count in zip(BUCKETS, span["buckets"])},
+                "over_10s": span["buckets"][-1],
+            }
+        return {"time": time.time(), "spans": snapshot}
+
+# every span as a Prometheus histogram (buckets are cumulative in that format)
+def prometheus_text():
+    lines = [
+        "# HELP ssp_span_seconds Time spent in Semantic Search Party hot paths",
+        "# TYPE ssp_span_seconds histogram",
+    ]
+    with spans_lock:
+        for name, span in sorted(spans.items()):
+            total = 0
+            for edge, count in zip(BUCKETS, span["buckets"]):
+                total += count
+                lines.append(f'ssp_span_seconds_bucket{{span="{name}",le="{edge}"}} {total}')
+            lines.append(f'ssp_span_seconds_bucket{{span="{name}",le="+Inf"}} {span["count"]}')
+            lines.append(f'ssp_span_seconds_sum{{span="{name}"}} {span["sum"]:.9f}')
+            lines.append(f'ssp_span_seconds_count{{span="{name}"}} {span["count"]}')
+    return "\n".join(lines) + "\n"
+
+# writes json_snapshot() to SSP_METRICS_FILE every few seconds on a background thread (if metrics are on and a file is set)
+def start_dump():
+    path = os.environ.get("SSP_METRICS_FILE")
+    if not ENABLED or not path:
+        return None
+    import json
+
+    every = float(os.environ.get("SSP_METRICS_EVERY", "10"))
+
+    def dump_loop():
+        while True:
+            time.sleep(every)
+            with open(path + ".tmp", "w") as dump_file:
+                json.dump(json_snapshot(), dump_file, indent=2)
+            os.replace(path + ".tmp", path)
+
+    thread = threading.Thread(target=dump_loop, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
+
+# whether level's round is going to be profiled (game.prefetch_round leaves that round to start_round)
+def will_profile(level):
+    return level == PROFILE_LEVEL and not profiling["done"]
+
+# called whenever a round starts: stops a running round profile and starts one for SSP_PROFILE_ROUND
+def round_started(level):
+    if PROFILE_LEVEL == 0:
+        return
+    if profiling["profiler"] is not None:
+        stop_profile()
+    if will_profile(level):
+        import cProfile
+        import tracemalloc
+
+        profiling["level"] = level
+        profiling["profiler"] = cProfile.Profile()
+        tracemalloc.start()
+        profiling["profiler"].enable()
+
+def stop_profile():
+    import tracemalloc
+
+    profiler = profiling["profiler"]
+    profiler.disable()
+    level = profiling["level"]
+    profiler.dump_stats(f"round_{level}.prof")
+
+    memory = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    with open(f"round_{level}_memory.txt", "w") as memory_file:
+        memory_file.write(f"current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n")
+        for stat in memory.statistics("lineno")[:25]:
+            memory_file.write(f"{stat}\n")
+
+    profiling["profiler"] = None
+    profiling["done"] = True
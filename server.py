@@ -0,0 +1,401 @@
+"""
+Headless game server for Semantic Search Party
+
+Runs many players' games at once without a window. The word list, level bins and word vectors
+(and the model, if there is no bundle) are loaded once and shared by every game; each game only
+keeps its own stats dictionary and its round's similarity table.
+
+The server is a small HTTP/1.1 JSON API on asyncio (standard library only). Anything that scores
+words runs on a thread pool so the event loop never waits on NumPy. Games that haven't been used for
+a while are written to sessions/ as snapshots (see session.py) and taken out of memory; the next
+request for one reads it back without scoring anything. Snapshots nobody comes back for are deleted.
+
+Endpoints (everything answers JSON):
+    POST   /games                  starts a game, returns its id and the first round
+                                   (body {"daily": "2026-10-18"} plays that day's precomputed puzzle, see daily.py)
+    GET    /games/<id>             level, points and guesses so far
+    GET    /stats                  number of games and the guess caches' hit/miss/eviction counters
+    GET    /metrics                timing histograms in Prometheus text format (start with SSP_METRICS=1)
+    POST   /games/<id>/guess       body {"guess": "dog"}
+    POST   /games/<id>/hint
+    POST   /games/<id>/reveal
+    POST   /games/<id>/forfeit
+    POST   /games/<id>/restart
+    POST   /games/<id>/score       body {"guesses": ["dog", "cat", ...]}, scores many guesses at once without playing them
+                                   (words that aren't in the word list come back with "known": false and no rank)
+    DELETE /games/<id>
+Game replies have an "out" list with one object per line the player should see:
+    {"text": "Correct!"} or {"guess": 3, "word": "dog", "similarity": 0.41, "rank": 37, "of": 3091}
+
+Run it with: python server.py [port]
+"""
+
+
+import asyncio
+import datetime
+import json
+import os
+import secrets
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import game
+import metrics
+from daily import open_day
+from lru_cache import make_cache, cache_stats
+from session import snapshot, resume
+
+NUM_LEVELS = 3
+MAX_POINTS = 100
+HOST = "127.0.0.1"
+PORT = 8080
+SCORING_THREADS = 4         # threads that run game actions off the event loop
+MAX_GAMES = 10000           # new games are refused past this many
+IDLE_SECONDS = 30 * 60      # games untouched for this long are written to disk
+EVICT_EVERY = 60            # seconds between checks for idle games
+SESSIONS_DIR = "sessions"
+KEEP_SUSPENDED_SECONDS = 7 * 24 * 60 * 60       # snapshots older than this are deleted
+MAX_BODY = 1024 * 1024
+SCORE_CACHE_BYTES = 8 * 1024 * 1024     # memory cap for (secret word, guess) scores shared by every game
+
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+               500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+# the resources every game shares plus the games themselves
+def make_server(nlp, words_only, bins, store, pairs):
+    store["score_cache"] = make_cache(SCORE_CACHE_BYTES)
+    return {
+        "nlp": nlp,
+        "words_only": words_only,
+        "bins": bins,
+        "store": store,
+        "pairs": pairs,
+        "executor": ThreadPoolExecutor(max_workers=SCORING_THREADS),
+        "games": {},        # game id -> {"data", "lock", "last_seen"}
+        "days": {},         # date -> opened daily puzzle, shared by every game playing it
+        "days_lock": threading.Lock(),      # days is used from the event loop and from resume on the thread pool
+        "waking": {},       # game id -> future reading its snapshot, so two requests for it only read it once
+    }
+
+# the opened puzzle for a date (None if it wasn't built), opened once and shared by every game playing it
+# the file is read outside the lock; if two threads open the same day at once, the first one stored is kept
+def get_day(server, date):
+    with server["days_lock"]:
+        day = server["days"].get(date)
+    if day is None:
+        day = open_day(date, server["words_only"], NUM_LEVELS)
+        if day is None:
+            return None
+        with server["days_lock"]:
+            day = server["days"].setdefault(date, day)
+    return day
+
+def session_path(game_id):
+    return os.path.join(SESSIONS_DIR, f"{game_id}.bin")
+
+def add_game(server, game_id, data):
+    server["games"][game_id] = {"data": data, "lock": asyncio.Lock(), "last_seen": time.monotonic()}
+
+# the blocking halves of suspend and wake, run on the thread pool so the event loop never waits on the disk
+def write_session(game_id, data):
+    os.makedirs(SESSIONS_DIR, exist_ok=True)
+    with open(session_path(game_id) + ".tmp", "wb") as session_file:
+        session_file.write(snapshot(data))
+    os.replace(session_path(game_id) + ".tmp", session_path(game_id))
+
+def remove_session(game_id):
+    if os.path.exists(session_path(game_id)):
+        os.remove(session_path(game_id))
+
+# the game from its snapshot (and the snapshot deleted), or None if there isn't one that fits this word list
+# like a new game it gets no prefetch executor: the scoring pool is for requests, rounds start when they are played
+# a snapshot that can't be read (cut short or damaged) is renamed to .bad, so the id answers 404 from then on
+# instead of failing on every request (delete_old_sessions removes it with the other old files)
+def read_session(server, game_id):
+    if not os.path.exists(session_path(game_id)):
+        return None
+    with open(session_path(game_id), "rb") as session_file:
+        blob = session_file.read()
+    try:
+        data = resume(blob, server["words_only"], server["bins"], server["store"], server["pairs"], None,
+                      lambda date: get_day(server, date))
+    except (ValueError, struct.error, IndexError) as error:
+        print(f"can't resume {session_path(game_id)} ({error}), moved it to {session_path(game_id)}.bad")
+        os.replace(session_path(game_id), session_path(game_id) + ".bad")
+        return None
+    os.remove(session_path(game_id))
+    return data
+
+# writes a game to disk and takes it out of memory
+# the game's lock is held while it is written, so no action changes it halfway; if a request came in meanwhile
+# (or the game was deleted) it stays as it is and the snapshot is thrown away
+async def suspend(server, game_id):
+    session = server["games"][game_id]
+    loop = asyncio.get_running_loop()
+    async with session["lock"]:
+        last_seen = session["last_seen"]
+        game.cancel_prefetch(session["data"])
+        await loop.run_in_executor(server["executor"], write_session, game_id, session["data"])
+        if server["games"].get(game_id) is session and session["last_seen"] == last_seen:
+            del server["games"][game_id]
+            return
+    await loop.run_in_executor(server["executor"], remove_session, game_id)
+
+# brings a suspended game back, returns False if there is no snapshot for it
+async def wake(server, game_id):
+    # ids come from the URL, only names token_urlsafe could have made are looked up on disk
+    if not game_id.replace("-", "").replace("_", "").isalnum():
+        return False
+    waking = server["waking"].get(game_id)
+    if waking is None:
+        waking = asyncio.get_running_loop().run_in_executor(server["executor"], read_session, server, game_id)
+        server["waking"][game_id] = waking
+        waking.add_done_callback(lambda future: server["waking"].pop(game_id, None))
+    data = await waking
+    if data is None:
+        return False
+    if game_id not in server["games"]:
+        add_game(server, game_id, data)
+    return True
+
+# turns the game's output lines into JSON objects
+def to_json(out):
+    lines = []
+    for line in out:
+        if line[0] == "text":
+            lines.append({"text": line[1]})
+        else:
+            num_guess, word, ss, rank, num_words = line[1:]
+            lines.append({"guess": num_guess, "word": word, "similarity": round(float(ss), 4), "rank": rank, "of": num_words})
+    return lines
+
+def summary(data):
+    return {
+        "level": data["level"],
+        "num_levels": data["NUM_LEVELS"],
+        "game_over": data["level"] > data["NUM_LEVELS"],
+        "round_points": data["rp"],
+        "total_points": data["tp"],
+        "total_guesses": data["tg"],
+        "hints_used": data["rh"],
+        "letters_given": data["letters_given"],
+    }
+
+# the batch scoring result as one JSON object per guess
+def batch_to_json(batch):
+    results = []
+    for i, word in enumerate(batch["guesses"]):
+        results.append({
+            "word": word,
+            "similarity": round(float(batch["similarity"][i]), 4),
+            "known": bool(batch["known"][i]),
+            # a word that isn't in the word list has no rank
+            "rank": int(batch["rank"][i]) if batch["known"][i] else None,
+            "already_guessed": bool(batch["already_guessed"][i]),
+            "correct": bool(batch["correct"][i]),
+        })
+    return results
+
+# runs one action on a game (on the thread pool), returns the lines for the player
+# after a correct guess or a forfeit the next round starts right away instead of after a pause
+def run_action(server, data, action, body):
+    out = []
+    if action == "start":
+        game.start_round(data, out)
+    elif action == "guess":
+        result = game.play_round(body["guess"], data, server["nlp"], out)
+        if result and result[0] is True:
+            game.start_round(data, out)
+    elif action == "hint":
+        game.hints(data, out)
+    elif action == "reveal":
+        game.letter_reveal(data, out)
+    elif action == "forfeit":
+        game.forfeit(data, out)
+        game.start_round(data, out)
+    elif action == "restart":
+        game.restart(data)
+        game.start_round(data, out)
+    elif action == "score":
+        return batch_to_json(game.score_batch(body["guesses"], data, server["nlp"]))
+    return out
+
+async def act(server, game_id, action, body):
+    session = server["games"][game_id]
+    session["last_seen"] = time.monotonic()
+    # one action at a time per game, but different games run in parallel
+    async with session["lock"]:
+        loop = asyncio.get_running_loop()
+        out = await loop.run_in_executor(server["executor"], run_action, server, session["data"], action, body)
+    if action == "score":
+        return {"game": game_id, "results": out}
+    return {"game": game_id, "out": to_json(out), "state": summary(session["data"])}
+
+# works out which endpoint a request is for, returns (status, reply)
+# reply is a dictionary sent as JSON, or a string sent as plain text
+async def route(server, method, path, body):
+    parts = [part for part in path.split("?")[0].split("/") if part]
+    if parts == ["stats"] and method == "GET":
+        return 200, {
+            "games": len(server["games"]),
+            "vector_cache": cache_stats(server["store"]["vector_cache"]),
+            "score_cache": cache_stats(server["store"]["score_cache"]),
+        }
+    if parts == ["metrics"] and method == "GET":
+        return 200, metrics.prometheus_text()
+    if not parts or parts[0] != "games" or len(parts) > 3:
+        return 404, {"error": "not found"}
+
+    if len(parts) == 1:
+        if method != "POST":
+            return 405, {"error": "use POST to start a game"}
+        if len(server["games"]) >= MAX_GAMES:
+            return 503, {"error": "too many games, try again later"}
+        daily = None
+        if "daily" in body:
+            try:
+                date = datetime.date.fromisoformat(str(body["daily"])).isoformat()
+            except ValueError:
+                return 400, {"error": 'send the date as {"daily": "YYYY-MM-DD"}'}
+            daily = get_day(server, date)
+            if daily is None:
+                return 404, {"error": f"there is no daily puzzle for {date}"}
+
+        game_id = secrets.token_urlsafe(12)
+        data = game.new_game(NUM_LEVELS, MAX_POINTS, server["words_only"], server["bins"], server["store"], server["pairs"])
+        data["daily"] = daily
+        add_game(server, game_id, data)
+        return 201, await act(server, game_id, "start", body)
+
+    game_id = parts[1]
+    if game_id not in server["games"] and not await wake(server, game_id):
+        return 404, {"error": "no game with that id (it may have been deleted after being idle for a week)"}
+    data = server["games"][game_id]["data"]
+
+    if len(parts) == 2:
+        if method == "GET":
+            server["games"][game_id]["last_seen"] = time.monotonic()
+            return 200, {"game": game_id, "state": summary(data)}
+        if method == "DELETE":
+            del server["games"][game_id]
+            return 200, {"game": game_id, "deleted": True}
+        return 405, {"error": "use GET or DELETE"}
+
+    action = parts[2]
+    if action not in ("guess", "hint", "reveal", "forfeit", "restart", "score"):
+        return 404, {"error": f"unknown action {action}"}
+    if method != "POST":
+        return 405, {"error": "use POST"}
+    if action != "restart" and data["level"] > data["NUM_LEVELS"]:
+        return 409, {"error": "the game is over, POST to restart to play again"}
+    if action == "guess":
+        guess = body.get("guess")
+        if not isinstance(guess, str) or not guess.strip():
+            return 400, {"error": 'send the guess as {"guess": "word"}'}
+        body = {"guess": guess.strip()}
+    if action == "score":
+        guesses = body.get("guesses")
+        if not isinstance(guesses, list) or not all(isinstance(guess, str) for guess in guesses):
+            return 400, {"error": 'send the guesses as {"guesses": ["word", ...]}'}
+    return 200, await act(server, game_id, action, body)
+
+# reads HTTP requests from one connection until it closes (keep-alive is supported)
+async def handle_connection(server, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, version = request_line.decode("latin-1").split()
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY:
+                status, reply = 413, {"error": "request body too large"}
+                body = None
+            else:
+                raw = await reader.readexactly(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    body = None
+                if not isinstance(body, dict):
+                    status, reply = 400, {"error": "the request body must be a JSON object"}
+                    body = None
+            if body is not None:
+                try:
+                    status, reply = await route(server, method, path, body)
+                except Exception as error:
+                    # a bug in one request answers 500 instead of dropping the connection without a reply
+                    print(f"error answering {method} {path}: {error!r}")
+                    status, reply = 500, {"error": "internal server error"}
+
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close" and length <= MAX_BODY
+            if isinstance(reply, str):
+                payload = reply.encode()
+                content_type = "text/plain; version=0.0.4"
+            else:
+                payload = json.dumps(reply).encode()
+                content_type = "application/json"
+            writer.write(
+                f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+def delete_old_sessions():
+    if os.path.isdir(SESSIONS_DIR):
+        oldest = time.time() - KEEP_SUSPENDED_SECONDS
+        for entry in os.scandir(SESSIONS_DIR):
+            if entry.stat().st_mtime < oldest:
+                os.remove(entry.path)
+
+# writes games nobody has touched for IDLE_SECONDS to disk and deletes snapshots older than KEEP_SUSPENDED_SECONDS
+# each game is written on the thread pool, so requests keep being answered while thousands of games are suspended
+async def evict_idle(server):
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(EVICT_EVERY)
+        cutoff = time.monotonic() - IDLE_SECONDS
+        for game_id in list(server["games"]):
+            # games can be used or deleted while earlier ones are written, so each one is checked when its turn comes
+            session = server["games"].get(game_id)
+            if session is not None and session["last_seen"] < cutoff and not session["lock"].locked():
+                await suspend(server, game_id)
+        await loop.run_in_executor(server["executor"], delete_old_sessions)
+
+async def serve(server, host=HOST, port=PORT):
+    listener = await asyncio.start_server(lambda reader, writer: handle_connection(server, reader, writer), host, port)
+    evictor = asyncio.create_task(evict_idle(server))
+    print(f"Semantic Search Party server on http://{host}:{port} ({len(server['words_only'])} words)")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        evictor.cancel()
+        server["executor"].shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+    metrics.start_dump()
+    server = make_server(*game.load_resources(NUM_LEVELS))
+    asyncio.run(serve(server, HOST, port))
@@ -0,0 +1,211 @@
+"""
+Game sessions for Semantic Search Party
+
+A game's state is a Session: a class with __slots__ and one typed field per stat, so a game costs a few
+hundred bytes plus its round's arrays instead of a dictionary with a hash table of its own.
+The game logic still reads and writes it like the old dictionary (data["rp"] += 1); keys that
+aren't fields (a front end's widgets, queues and timers) go to the extras dictionary.
+
+The round is kept in arrays:
+    - ss_list and the sorted table (see embeddings.sort_table) are NumPy arrays
+    - guessed words that are in the store are a set of row numbers (guessed_rows), only guesses the store
+      doesn't have (typos, phrases) are kept as text (guessed_other)
+    - words given as hints are a set of row numbers (hinted_rows)
+    - the hint ladder is positions in the sorted table by similarity band (see embeddings.build_ladder)
+
+snapshot() turns a session into a few bytes per vocabulary word (the sorted table, so resuming never
+scores the vocabulary again) plus a small header, and resume() turns those bytes back into a session.
+Both take microseconds, so the server can write idle games to disk and bring them back on their next request.
+The shared resources (word list, bins, store) and a front end's extras aren't part of a snapshot.
+"""
+
+
+import struct
+import numpy as np
+from embeddings import make_table, make_ladder, store_vector
+
+SNAPSHOT_MAGIC = b"SSPS"
+SNAPSHOT_VERSION = 1
+
+# the counters, in the order they are packed into a snapshot's header
+COUNTERS = ("NUM_LEVELS", "MAX_POINTS", "level", "tp", "tg", "th", "trc", "rp", "rg", "rh",
+            "letters_given", "total_letters_given", "num_guess")
+# magic, version, store size, vocabulary size, counters, max_ss, last_lev, whether the round has a ladder
+HEADER = struct.Struct(f"<4sHII{len(COUNTERS)}id??")
+LENGTH = struct.Struct("<I")
+
+
+# a plain class with __slots__ rather than a dataclass: importing dataclasses and generating its methods
+# would cost more than the rest of game.py's imports together
+class Session:
+    __slots__ = (
+        "NUM_LEVELS", "MAX_POINTS", "words_only", "bins", "store", "pairs", "executor",
+        "level", "tp", "tg", "th", "trc", "rp", "rg", "rh", "guessed_rows", "guessed_other",
+        "sw", "sv", "max_ss", "ss_list", "table", "ladder", "daily", "hinted_rows",
+        "letters_given", "total_letters_given", "num_guess", "last_lev", "next_round", "extras",
+    )
+
+    def __init__(self, NUM_LEVELS: int, MAX_POINTS: int, words_only: list, bins: dict, store: dict, pairs=None, executor=None):
+        self.NUM_LEVELS = NUM_LEVELS
+        self.MAX_POINTS = MAX_POINTS
+        self.words_only = words_only        # all words in dataset
+        self.bins = bins        # words sorted by difficulty and where each level starts (see game.make_bins)
+        self.store = store      # normalized embedding matrix of words_only
+        self.pairs = pairs      # memory-mapped words_only x words_only similarity table (None if not built)
+        self.executor = executor        # background thread that prepares the next round (None to prepare rounds when they start)
+        self.level: int = 1
+        self.tp: int = 0        # total points
+        self.tg: int = 0        # total guesses
+        self.th: int = 0        # total hints used
+        self.trc: int = 0       # total rounds completed
+        self.rp: int = 0        # current round points
+        self.rg: int = 0        # current round guesses
+        self.rh: int = 0        # current round hints used
+        self.guessed_rows: set = set()      # store rows of the words already guessed in the round
+        self.guessed_other: set = set()     # guesses in the round that aren't in the store
+        self.sw: str = ""       # current secret word
+        self.sv = None      # current secret word unit vector
+        self.max_ss: float = 0      # max semantic similarity score in current round
+        self.ss_list = np.zeros(0)      # similarity of every word in words_only to the secret word (same order)
+        self.table = None       # ss_list sorted once per round (order, sorted scores and rank of each word)
+        self.ladder = None      # the round's hints by similarity band (see embeddings.build_ladder), None when hints come from the ANN index
+        self.daily = None       # the day's puzzle from daily.open_day, rounds are read from it instead of computed
+        self.hinted_rows: set = set()       # store rows of the words given as hints
+        self.letters_given: int = 0     # num letters revealed
+        self.total_letters_given: int = 0
+        self.num_guess: int = 0     # sequential number for display of each guess
+        self.last_lev: bool = False     # True when last level reached
+        self.next_round = None      # (level, future) of the round being prepared in the background
+        self.extras: dict = {}      # anything else a front end keeps with the game
+
+    # the game reads and writes sessions like the dictionary they replaced
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            return self.extras[key]
+
+    def __setitem__(self, key, value):
+        if key in FIELD_NAMES:
+            setattr(self, key, value)
+        else:
+            self.extras[key] = value
+
+    def __contains__(self, key):
+        return key in FIELD_NAMES or key in self.extras
+
+FIELD_NAMES = frozenset(Session.__slots__)
+
+
+# whether a guess was already made this round
+def is_guessed(session, guess):
+    row = session.store["index"].get(guess)
+    if row is None:
+        return guess in session.guessed_other
+    return row in session.guessed_rows
+
+def mark_guessed(session, guess):
+    row = session.store["index"].get(guess)
+    if row is None:
+        session.guessed_other.add(guess)
+    else:
+        session.guessed_rows.add(row)
+
+def num_guessed(session):
+    return len(session.guessed_rows) + len(session.guessed_other)
+
+# every word guessed this round as text
+def guessed_words(session):
+    return {session.store["words"][row] for row in session.guessed_rows} | session.guessed_other
+
+def clear_guesses(session):
+    session.guessed_rows = set()
+    session.guessed_other = set()
+
+
+def pack_bytes(blob):
+    return LENGTH.pack(len(blob)) + blob
+
+def pack_text(text):
+    return pack_bytes(text.encode("utf-8"))
+
+def pack_array(array, dtype):
+    return pack_bytes(np.ascontiguousarray(array, dtype=dtype).tobytes())
+
+# reads the length-prefixed parts of a snapshot one after another
+def unpack_parts(blob, start):
+    parts = []
+    pos = start
+    while pos < len(blob):
+        (length,) = LENGTH.unpack_from(blob, pos)
+        pos += LENGTH.size
+        parts.append(memoryview(blob)[pos:pos + length])
+        pos += length
+    return parts
+
+# the session as bytes (the game's counters, the round's sorted table and ladder, and the words guessed and hinted)
+def snapshot(session):
+    table = session.table
+    has_table = table is not None
+    has_ladder = session.ladder is not None
+    header = HEADER.pack(
+        SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(session.store["words"]), len(session.words_only),
+        *(getattr(session, name) for name in COUNTERS), float(session.max_ss), session.last_lev, has_ladder,
+    )
+    parts = [
+        pack_text(session.sw),
+        pack_text("" if session.daily is None else session.daily["date"]),
+        pack_text("\n".join(session.guessed_other)),
+        pack_array(sorted(session.guessed_rows), np.uint32),
+        pack_array(sorted(session.hinted_rows), np.uint32),
+        pack_array(table["order"] if has_table else [], np.uint32),
+        pack_array(table["sorted_ss"] if has_table else [], np.float32),
+    ]
+    if has_ladder:
+        parts.append(pack_array(session.ladder["positions"], np.uint32))
+        parts.append(pack_array(session.ladder["offsets"], np.uint32))
+        parts.append(pack_array([session.ladder["seed"]], np.uint64))
+        parts.append(pack_array(session.ladder["heads"], np.uint32))
+    return header + b"".join(parts)
+
+# a session from snapshot bytes, sharing the same resources new_game would be given
+# open_daily(date) returns the day's puzzle for a daily game (server.py keeps the opened days), the game
+# keeps going without it otherwise; the next round isn't prefetched until game.prefetch_round is called
+def resume(blob, words_only, bins, store, pairs=None, executor=None, open_daily=None):
+    magic, version, num_words, num_vocab, *values = HEADER.unpack_from(blob)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError("not a game snapshot, or one from a different version")
+    if num_words != len(store["words"]) or num_vocab != len(words_only):
+        raise ValueError("the snapshot was taken with a different word list")
+    counters = values[:len(COUNTERS)]
+    max_ss, last_lev, has_ladder = values[len(COUNTERS):]
+
+    parts = unpack_parts(blob, HEADER.size)
+    sw, date, other = (bytes(part).decode("utf-8") for part in parts[:3])
+    session = Session(counters[0], counters[1], words_only, bins, store, pairs, executor)
+    for name, value in zip(COUNTERS, counters):
+        setattr(session, name, value)
+    session.max_ss = max_ss
+    session.last_lev = last_lev
+    session.sw = sw
+    session.guessed_other = set(other.split("\n")) if other else set()
+    session.guessed_rows = set(np.frombuffer(parts[3], dtype=np.uint32).tolist())
+    session.hinted_rows = set(np.frombuffer(parts[4], dtype=np.uint32).tolist())
+    if date and open_daily is not None:
+        session.daily = open_daily(date)
+
+    order = np.frombuffer(parts[5], dtype=np.uint32)
+    if len(order):
+        sorted_ss = np.frombuffer(parts[6], dtype=np.float32)
+        session.ss_list = np.empty(len(order), dtype=np.float32)
+        session.ss_list[order] = sorted_ss
+        session.table = make_table(order, sorted_ss)
+        session.sv = store_vector(store, sw)
+    if has_ladder:
+        # snapshots from before the seed and heads were saved start every band from the top again
+        # (words already hinted score below the hint range, so they can't come up again)
+        seed = int(np.frombuffer(parts[9], dtype=np.uint64)[0]) if len(parts) > 10 else 0
+        heads = np.frombuffer(parts[10], dtype=np.uint32).tolist() if len(parts) > 10 else None
+        session.ladder = make_ladder(np.frombuffer(parts[7], dtype=np.uint32).astype(np.int64),
+                                     np.frombuffer(parts[8], dtype=np.uint32).astype(np.int64), seed, heads)
+    return session
@@ -0,0 +1,143 @@
+"""
+Shared-memory word vectors for Semantic Search Party
+
+One Python process can't use every core for scoring, but starting N processes that each load
+en_core_web_lg (or the bundle) keeps N copies of the vectors in memory. Instead, the parent
+process copies the normalized embedding matrix into multiprocessing.shared_memory once, and every
+worker process attaches to that block by name and wraps it in a NumPy array without copying it.
+A float16 or int8 matrix is shared as it is (an int8 matrix's row scales get a second block).
+The precomputed all-pairs table (all_pairs.py) is already a file, so workers just memory-map it too.
+
+Typical use:
+    handle, blocks = publish_store(store, ALL_PAIRS_FILE)
+    pool = start_workers(handle, 8)
+    ss_list = pool.submit(round_table, "ocean").result()
+    scores = pool.submit(score_guesses, "ocean", ["sea", "water", "boat"]).result()
+    pool.shutdown(); release(blocks)
+
+Workers started by the publishing process share its resource tracker, so nothing is unlinked
+until release() is called in the parent.
+
+Try the scaling with: python shared_store.py [max number of workers]
+"""
+
+
+import os
+import sys
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from embeddings import make_store, lookup_vector, store_vector, similarity_table
+
+
+# copies an array into a new shared block, returns the block and what's needed to open it again
+def share_array(array):
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    shared[:] = array
+    return block, {"name": block.name, "shape": array.shape, "dtype": array.dtype.str}
+
+# copies the store's matrix into shared memory, returns the handle workers need and the blocks to release later
+# the handle is small (block names, shapes and the word list) so it is cheap to send to each worker
+def publish_store(store, pairs_path=None):
+    block, matrix_info = share_array(store["matrix"])
+    blocks = [block]
+    scale_info = None
+    if store["scale"] is not None:
+        scale_block, scale_info = share_array(store["scale"])
+        blocks.append(scale_block)
+
+    handle = {
+        "matrix": matrix_info,
+        "scale": scale_info,
+        "words": store["words"],
+        "game_words": store["game_words"],
+        "pairs_path": pairs_path if pairs_path and os.path.exists(pairs_path) else None,
+    }
+    return handle, blocks
+
+# opens a block someone else created (Python 3.13+ can skip registering it with the resource tracker)
+def open_block(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+# a read-only array on top of a shared block (the block has to stay open while the array is used)
+def attach_array(info):
+    block = open_block(info["name"])
+    array = np.ndarray(info["shape"], dtype=np.dtype(info["dtype"]), buffer=block.buf)
+    array.flags.writeable = False
+    return block, array
+
+# builds a store on top of the shared blocks without copying the matrix
+def attach_store(handle):
+    block, matrix = attach_array(handle["matrix"])
+    blocks = [block]
+    scale = None
+    if handle["scale"] is not None:
+        scale_block, scale = attach_array(handle["scale"])
+        blocks.append(scale_block)
+    store = make_store(handle["words"], matrix, handle["game_words"], scale)
+    store["blocks"] = blocks        # keeps the blocks open for as long as the store is used
+    return store
+
+# closes and removes the shared blocks (only the process that published them should call this)
+def release(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+# every worker process attaches once when it starts
+worker_state = {}
+
+def init_worker(handle):
+    worker_state["store"] = attach_store(handle)
+    worker_state["pairs"] = None
+    if handle["pairs_path"] is not None:
+        worker_state["pairs"] = np.load(handle["pairs_path"], mmap_mode="r")
+
+# a pool of worker processes that all read the same shared vectors
+def start_workers(handle, processes=None):
+    return ProcessPoolExecutor(max_workers=processes, initializer=init_worker, initargs=(handle,))
+
+# similarity of every vocabulary word to the secret word (the round's table), run in a worker
+def round_table(secret_word):
+    store = worker_state["store"]
+    if worker_state["pairs"] is not None:
+        return np.asarray(worker_state["pairs"][store["index"][secret_word]], dtype=np.float32)
+    return similarity_table(store, store_vector(store, secret_word))
+
+# similarity of each guess to the secret word, run in a worker (guesses missing from the store score 0.0)
+def score_guesses(secret_word, guesses):
+    store = worker_state["store"]
+    secret_vec = store_vector(store, secret_word)
+    scores = []
+    for guess in guesses:
+        scores.append(float(secret_vec @ lookup_vector(store, guess.lower(), None)))
+    return scores
+
+
+if __name__ == "__main__":
+    import game
+
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    nlp, words_only, bins, store, pairs = game.load_resources(3)
+    handle, blocks = publish_store(store)
+    secrets = words_only[:2000]
+
+    try:
+        workers = 1
+        while workers <= max_workers:
+            with start_workers(handle, workers) as pool:
+                list(pool.map(round_table, secrets[:workers]))          # start and attach every worker first
+                start = time.perf_counter()
+                list(pool.map(round_table, secrets, chunksize=16))
+                seconds = time.perf_counter() - start
+            print(f"{workers} worker(s): {len(secrets) / seconds:,.0f} round tables per second")
+            workers *= 2
+    finally:
+        release(blocks)
@@ -0,0 +1,296 @@
+"""
+Bot simulations for Semantic Search Party
+
+Plays thousands of games without a window to see how NUM_LEVELS, MAX_POINTS, the hint and letter reveal
+penalties (game.HINT_PENALTY, game.REVEAL_PENALTY) and the difficulty bins play out. Each game is the
+real game logic (game.start_round, play_round, hints, letter_reveal, forfeit) driven by a bot that only
+sees what a player would see, the output lines:
+    random      guesses random vocabulary words
+    greedy      guesses the nearest neighbours of its most similar guess so far (hill climbing)
+    hints       asks for hints until there are none left, then reveals letters, then guesses
+                like greedy but only words that start with the revealed letters
+A round ends when the bot guesses the secret word or forfeits after MAX_GUESSES guesses.
+
+Games run on a pool of processes that all read the word vectors from shared memory (shared_store.py),
+each with its own seed, so the same settings always give the same numbers however many workers there are.
+The results are one row per round played; the summary gives, per bot and level, how often the round
+was solved, guesses (mean, p50, p90), points, hints and letter reveals, and points per game.
+
+By default the vectors come from the model stand-in in benchmark.py (FakeNLP) so no model is needed;
+its vectors are random, so similarity means nothing to the greedy bot. --model plays on the real
+vectors (the bundle or en_core_web_lg, like the game).
+
+Run it with: python simulate.py [--bots random,greedy,hints] [--games 2000] [--workers 8] [--levels 3]
+                                [--max-points 100] [--hint-penalty 5] [--reveal-penalty 10] [--size 30000] [--model] [--out results.json]
+"""
+
+
+import argparse
+import bisect
+import json
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import game
+import shared_store
+from embeddings import similarity_table, store_vector
+from lru_cache import make_cache, cache_get, cache_put
+from session import is_guessed
+
+NUM_LEVELS = 3
+MAX_POINTS = 100
+GAMES = 2000
+MAX_GUESSES = 200       # a bot forfeits the round after this many guesses
+MAX_ACTIONS = 400       # or after this many actions of any kind
+NEIGHBOURS = 50         # nearest neighbours the greedy bots try for each word
+NEIGHBOUR_CACHE_BYTES = 32 * 1024 * 1024
+CHUNK_GAMES = 100       # games sent to a worker at once
+SEED = 1210
+
+# one row per round in the results
+ROUND_FIELDS = ("game", "level", "guesses", "points", "hints", "reveals", "solved")
+
+
+# every worker process attaches to the shared vectors and keeps what the bots look words up in
+worker_state = {}
+
+def init_worker(handle, bins, settings):
+    shared_store.init_worker(handle)
+    worker_state["bins"] = bins
+    worker_state["settings"] = settings
+    worker_state["sorted_words"] = sorted(shared_store.worker_state["store"]["words"][:handle["game_words"]])
+    worker_state["neighbours"] = make_cache(NEIGHBOUR_CACHE_BYTES)
+    game.HINT_PENALTY = settings["hint_penalty"]
+    game.REVEAL_PENALTY = settings["reveal_penalty"]
+
+# store rows of the NEIGHBOURS vocabulary words most similar to word (most similar first), cached per worker
+def neighbours(store, word):
+    rows = cache_get(worker_state["neighbours"], word)
+    if rows is None:
+        scores = similarity_table(store, store_vector(store, word))
+        count = min(NEIGHBOURS + 1, len(scores))
+        rows = np.argpartition(-scores, count - 1)[:count]
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        rows = rows[rows != store["index"][word]].astype(np.int32)
+        cache_put(worker_state["neighbours"], word, rows, rows.nbytes)
+    return rows
+
+
+# what a bot remembers during a round, updated from the output lines like a player reading them
+def new_round_state():
+    return {
+        "best": None,       # most similar word seen so far (guessed or hinted)
+        "best_ss": -1.0,
+        "closest": None,        # the "Closest Word" the hint button gave, not guessed yet
+        "prefix": "",       # letters revealed so far
+        "hints_left": True,
+        "reveals_left": True,
+    }
+
+def observe(state, out):
+    for line in out:
+        if line[0] == "guess":
+            word, ss = line[2], line[3]
+            if ss > state["best_ss"]:
+                state["best"] = word
+                state["best_ss"] = ss
+        elif line[1].startswith("Closest Word: "):
+            state["closest"] = line[1][len("Closest Word: "):]
+        elif line[1] == "No more hints available":
+            state["hints_left"] = False
+        elif line[1].startswith("Letter Reveal: "):
+            state["prefix"] = line[1][len("Letter Reveal: "):].split("_")[0]
+        elif line[1].startswith("No more letter reveal"):
+            state["reveals_left"] = False
+
+# a random vocabulary word that starts with prefix and wasn't guessed yet (None if there isn't one)
+def random_word(data, prefix, rng):
+    words = worker_state["sorted_words"]
+    lo = bisect.bisect_left(words, prefix)
+    hi = bisect.bisect_left(words, prefix + "\U0010ffff") if prefix else len(words)
+    for _ in range(8):
+        if lo >= hi:
+            return None
+        word = words[rng.randrange(lo, hi)]
+        if not is_guessed(data, word):
+            return word
+    # most of the range was guessed already, so it is scanned instead
+    unguessed = [word for word in words[lo:hi] if not is_guessed(data, word)]
+    return rng.choice(unguessed) if unguessed else None
+
+# the greedy guess: the closest word from the hint button, else the best word's nearest unguessed neighbour
+# (only words starting with the revealed letters), else a random word
+def greedy_guess(data, state, rng):
+    store = data["store"]
+    closest = state["closest"]
+    if closest is not None:
+        state["closest"] = None
+        if not is_guessed(data, closest):
+            return closest
+    if state["best"] is not None and state["best"] in store["index"]:
+        for row in neighbours(store, state["best"]):
+            word = store["words"][row]
+            if word.startswith(state["prefix"]) and not is_guessed(data, word):
+                return word
+    return random_word(data, state["prefix"], rng) or random_word(data, "", rng)
+
+
+# bots get the game, their round state and a seeded random.Random, and return the next action
+def random_bot(data, state, rng):
+    return "guess", random_word(data, "", rng)
+
+def greedy_bot(data, state, rng):
+    return "guess", greedy_guess(data, state, rng)
+
+def hint_bot(data, state, rng):
+    if state["hints_left"]:
+        return "hint", None
+    if state["reveals_left"]:
+        return "reveal", None
+    return "guess", greedy_guess(data, state, rng)
+
+BOTS = {"random": random_bot, "greedy": greedy_bot, "hints": hint_bot}
+
+
+# plays one whole game, returns a row per round (see ROUND_FIELDS)
+def play_game(bot, data, rng, game_number):
+    rows = []
+    out = []
+    game.start_round(data, out)
+    while data["level"] <= data["NUM_LEVELS"]:
+        level = data["level"]
+        state = new_round_state()
+        guesses = 0
+        solved = False
+        for _ in range(MAX_ACTIONS):
+            action, word = bot(data, state, rng)
+            out = []
+            if action == "guess" and word is not None:
+                guesses += 1
+                result = game.play_round(word, data, None, out)
+                if result and result[0] is True:
+                    solved = True
+                    break
+            elif action == "hint":
+                game.hints(data, out)
+            elif action == "reveal":
+                game.letter_reveal(data, out)
+            observe(state, out)
+            if guesses >= MAX_GUESSES or word is None and action == "guess":
+                break
+
+        if solved:
+            rows.append((game_number, level, guesses, data["rp"], data["rh"], data["letters_given"], 1))
+        else:
+            rows.append((game_number, level, guesses, 0, data["rh"], data["letters_given"], 0))
+            game.forfeit(data, out)
+        game.start_round(data, [])
+    return rows
+
+# plays one game per seed with the named bot, run in a worker
+def run_games(bot_name, seeds):
+    import random
+
+    store = shared_store.worker_state["store"]
+    bins = worker_state["bins"]
+    settings = worker_state["settings"]
+    words_only = store["words"][:store["game_words"]]
+    rows = []
+    for seed in seeds:
+        # the game picks secret words and hints with the random module, the bot has its own generator
+        random.seed(seed)
+        data = game.new_game(settings["num_levels"], settings["max_points"], words_only, bins, store)
+        rows.extend(play_game(BOTS[bot_name], data, random.Random(seed), seed))
+    return np.array(rows, dtype=np.int64).reshape(-1, len(ROUND_FIELDS))
+
+# plays games games with every bot in bot_names on workers processes, returns {bot name: rows}
+def simulate(store, bins, bot_names, games=GAMES, workers=None, settings=None, seed=SEED):
+    seeds = list(range(seed, seed + games))
+    chunks = [seeds[start:start + CHUNK_GAMES] for start in range(0, games, CHUNK_GAMES)]
+    handle, blocks = shared_store.publish_store(store)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(handle, bins, settings)) as pool:
+            results = {}
+            for bot_name in bot_names:
+                results[bot_name] = np.concatenate(list(pool.map(run_games, [bot_name] * len(chunks), chunks)))
+            return results
+    finally:
+        shared_store.release(blocks)
+
+# aggregate stats per level (and for whole games) from a bot's rows
+def summarize(rows, max_points):
+    column = {name: rows[:, i] for i, name in enumerate(ROUND_FIELDS)}
+    levels = {}
+    for level in np.unique(column["level"]):
+        at_level = column["level"] == level
+        guesses = column["guesses"][at_level]
+        levels[int(level)] = {
+            "rounds": int(at_level.sum()),
+            "solved": round(float(column["solved"][at_level].mean()), 4),
+            "guesses_mean": round(float(guesses.mean()), 2),
+            "guesses_p50": float(np.percentile(guesses, 50)),
+            "guesses_p90": float(np.percentile(guesses, 90)),
+            "points_mean": round(float(column["points"][at_level].mean()), 2),
+            "hints_mean": round(float(column["hints"][at_level].mean()), 2),
+            "reveals_mean": round(float(column["reveals"][at_level].mean()), 2),
+        }
+    game_points = np.bincount(column["game"] - column["game"].min(), weights=column["points"])
+    return {
+        "games": int(len(np.unique(column["game"]))),
+        "points_per_game_mean": round(float(game_points.mean()), 2),
+        "points_per_game_max": int(max_points * len(levels)),
+        "levels": levels,
+    }
+
+def print_summary(bot_name, summary, seconds):
+    print(f"\n{bot_name}: {summary['games']} games in {seconds:.1f} s ({summary['games'] / seconds:.0f} games/s), "
+          f"{summary['points_per_game_mean']} / {summary['points_per_game_max']} points per game")
+    print(f"  {'level':>5} {'solved':>7} {'guesses':>8} {'p50':>6} {'p90':>6} {'points':>7} {'hints':>6} {'reveals':>8}")
+    for level, stats in summary["levels"].items():
+        print(f"  {level:>5} {stats['solved']:>7.1%} {stats['guesses_mean']:>8} {stats['guesses_p50']:>6.0f} {stats['guesses_p90']:>6.0f} "
+              f"{stats['points_mean']:>7} {stats['hints_mean']:>6} {stats['reveals_mean']:>8}")
+
+
+if __name__ == "__main__":
+    from benchmark import FakeNLP, make_words, make_freqs
+    from embeddings import build_matrix, make_store
+
+    parser = argparse.ArgumentParser(description="Semantic Search Party bot simulations")
+    parser.add_argument("--bots", default="random,greedy,hints", help=f"comma separated bots ({', '.join(BOTS)})")
+    parser.add_argument("--games", type=int, default=GAMES, help="games per bot")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--levels", type=int, default=NUM_LEVELS, help="NUM_LEVELS")
+    parser.add_argument("--max-points", type=int, default=MAX_POINTS, help="MAX_POINTS")
+    parser.add_argument("--hint-penalty", type=int, default=game.HINT_PENALTY, help="points a hint costs")
+    parser.add_argument("--reveal-penalty", type=int, default=game.REVEAL_PENALTY, help="points a letter reveal costs")
+    parser.add_argument("--size", type=int, default=0, help="play on this many made-up words instead of the word list")
+    parser.add_argument("--model", action="store_true", help="use the real vectors instead of the stand-in")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--out", help="where to save the JSON summary")
+    args = parser.parse_args()
+
+    if args.model:
+        nlp, words, bins, store, pairs = game.load_resources(args.levels)
+    else:
+        words = make_words(args.size) if args.size else game.read_words()
+        bins = game.make_bins(words, game.difficulty_score(game.scale(make_freqs(words)), words), args.levels)
+        store = make_store(words, build_matrix(words, FakeNLP(words)))
+    settings = {
+        "num_levels": args.levels,
+        "max_points": args.max_points,
+        "hint_penalty": args.hint_penalty,
+        "reveal_penalty": args.reveal_penalty,
+    }
+
+    summaries = {"settings": settings, "words": len(words), "bots": {}}
+    for bot_name in args.bots.split(","):
+        start = time.perf_counter()
+        rows = simulate(store, bins, [bot_name], args.games, args.workers, settings, args.seed)[bot_name]
+        seconds = time.perf_counter() - start
+        summaries["bots"][bot_name] = summarize(rows, args.max_points)
+        print_summary(bot_name, summaries["bots"][bot_name], seconds)
+
+    if args.out:
+        with open(args.out, "w") as out_file:
+            json.dump(summaries, out_file, indent=2)
+        print(f"\nSaved {args.out}")
@@ -0,0 +1,150 @@
+"""
+Spell index for Semantic Search Party
+
+A guess that isn't a word the game knows used to be scored anyway: it went through the model (or
+the store's lookup), got a zero vector and showed up as 0.0 with a rank near the bottom, which tells
+the player nothing. The index answers two questions before anything is scored:
+    - is this a word in the store? (so it has a real vector)
+    - if not, which store words are within MAX_DISTANCE edits of it? ("did you mean ...")
+
+It is a symmetric delete index like SymSpell: every word's first PREFIX_LENGTH letters, with up to
+MAX_DISTANCE letters deleted, is hashed, and a guess is looked up by deleting up to MAX_DISTANCE
+letters from its own prefix. Two words within MAX_DISTANCE edits always share one of those
+deletes, so the lookup only has to check the few words whose hashes match, with an exact
+Damerau-Levenshtein distance (a swap of two neighbouring letters counts as one edit) computed for all
+of them at once.
+
+Everything is NumPy: the prefixes are one fixed-width array of code points, each delete pattern is a
+few column operations on it, and the index is two sorted uint32 arrays (hash and store row),
+8 bytes for each of a word's (at most 29) deletes. Building it takes a few milliseconds for the 3k
+game words and a couple of seconds (about 100 MB) for a 500k-word store. Checking whether a guess is a
+word is one hash lookup (tens of microseconds), and suggestions take a few hundred microseconds
+at most, with either size. It is built when the game starts (see game.load_resources).
+
+Words are compared in lowercase, like guesses are.
+"""
+
+
+from itertools import combinations
+import numpy as np
+
+MAX_DISTANCE = 2        # most edits between a guess and a suggestion
+PREFIX_LENGTH = 7       # letters of each word that are indexed (longer words are checked in full afterwards)
+MAX_SUGGESTIONS = 3
+# one odd multiplier per letter position, the hash is the sum of code point times multiplier (mod 2**32)
+MULTIPLIERS = np.array([0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F, 0x165667B1, 0xD3A2646D, 0xFD7046C5], dtype=np.uint32)
+
+
+# the sets of prefix positions that are deleted: none, every single one, every pair and so on up to max_distance
+def delete_patterns(length, max_distance):
+    patterns = []
+    for count in range(min(max_distance, length) + 1):
+        patterns.extend(combinations(range(length), count))
+    return patterns
+
+# for a prefix of length letters: one row per delete pattern with the positions that are kept, padded with
+# length (which points at a zero after the prefix), so a prefix's deletes are one fancy index (cached per length)
+pattern_cache = {}
+
+def kept_positions(length, max_distance):
+    key = (length, max_distance)
+    if key not in pattern_cache:
+        kept = np.full((len(delete_patterns(length, max_distance)), PREFIX_LENGTH), length, dtype=np.intp)
+        for i, deleted in enumerate(delete_patterns(length, max_distance)):
+            positions = [j for j in range(length) if j not in deleted]
+            kept[i, :len(positions)] = positions
+        pattern_cache[key] = kept
+    return pattern_cache[key]
+
+# builds the index over the store's words (row numbers in the index are store rows)
+def build_spell(words, max_distance=MAX_DISTANCE):
+    # a fixed-width unicode array is already PREFIX_LENGTH uint32 code points per word, padded with zeros
+    prefixes = np.array([word.lower()[:PREFIX_LENGTH] for word in words], dtype=f"<U{PREFIX_LENGTH}")
+    codes = prefixes.view(np.uint32).reshape(len(words), PREFIX_LENGTH)
+    rows = np.arange(len(words), dtype=np.uint64)
+
+    keys = []
+    for deleted in delete_patterns(PREFIX_LENGTH, max_distance):
+        kept = [j for j in range(PREFIX_LENGTH) if j not in deleted]
+        hashes = np.zeros(len(words), dtype=np.uint32)
+        for position, column in enumerate(kept):
+            hashes += codes[:, column] * MULTIPLIERS[position]
+        keys.append((hashes.astype(np.uint64) << np.uint64(32)) | rows)
+    keys = np.concatenate(keys)
+    keys.sort()
+    # deleting the zero padding of a short word gives a delete it already has, those repeats are dropped
+    # (np.unique would do the same but is much slower than sorting in place on arrays this size)
+    keep = np.ones(len(keys), dtype=bool)
+    keep[1:] = keys[1:] != keys[:-1]
+    keys = keys[keep]
+    return {
+        "hashes": (keys >> np.uint64(32)).astype(np.uint32),
+        "rows": (keys & np.uint64(0xFFFFFFFF)).astype(np.uint32),
+        "lengths": np.fromiter((min(len(word), 255) for word in words), dtype=np.uint8, count=len(words)),
+        "max_distance": max_distance,
+    }
+
+# Damerau-Levenshtein distance (optimal string alignment) from text to each of words, as an array
+# all the words are filled in at once, one row of the table per letter of text (the table is stored
+# position by word, so every step works on contiguous rows): substitutions, deletions and swaps come
+# from the row before, and insertions (from the left in the same row) are a running minimum
+def edit_distances(text, words):
+    width = max(len(word) for word in words)
+    letters = np.array(words, dtype=f"<U{width}").view(np.uint32).reshape(len(words), width).T.copy()
+    lengths = np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words))
+    steps = np.arange(width + 1)[:, None]
+    codes = [ord(letter) for letter in text]
+
+    previous2 = None
+    previous = np.repeat(steps, len(words), axis=1)
+    for i in range(1, len(codes) + 1):
+        letter = codes[i - 1]
+        current = np.empty_like(previous)
+        current[0] = i
+        np.minimum(previous[:-1] + (letters != letter), previous[1:] + 1, out=current[1:])
+        if i > 1:
+            swapped = (letters[:-1] == letter) & (letters[1:] == codes[i - 2])
+            np.minimum(current[2:], previous2[:-2] + 1, out=current[2:], where=swapped)
+        current -= steps
+        np.minimum.accumulate(current, axis=0, out=current)
+        current += steps
+        previous2, previous = previous, current
+    return previous[lengths, np.arange(len(words))]
+
+# store rows whose prefix shares a delete with text's prefix (and whose length is within max_distance of text's)
+def candidate_rows(index, text, max_distance):
+    prefix = text[:PREFIX_LENGTH]
+    codes = np.zeros(len(prefix) + 1, dtype=np.uint32)
+    codes[:len(prefix)] = [ord(letter) for letter in prefix]
+    hashes = (codes[kept_positions(len(prefix), max_distance)] * MULTIPLIERS).sum(axis=1, dtype=np.uint32)
+    starts = np.searchsorted(index["hashes"], hashes, side="left")
+    ends = np.searchsorted(index["hashes"], hashes, side="right")
+    rows = np.unique(np.concatenate([index["rows"][start:end] for start, end in zip(starts, ends)]))
+    return rows[np.abs(index["lengths"][rows].astype(np.int64) - len(text)) <= max_distance]
+
+# whether text (in any case) is one of the store's words
+def is_word(index, words, text):
+    text = text.lower()
+    return any(words[row].lower() == text for row in candidate_rows(index, text, 0))
+
+# up to count store words within max_distance edits of text, closest first (ties keep store order,
+# so game words come before the extra guess words)
+def suggest(index, words, text, count=MAX_SUGGESTIONS, max_distance=None):
+    if max_distance is None:
+        max_distance = index["max_distance"]
+    text = text.lower()
+    rows = candidate_rows(index, text, max_distance)
+    if len(rows) == 0 or not text:
+        return []
+    candidates = [words[row].lower() for row in rows]
+    distances = edit_distances(text, candidates)
+    suggestions = []
+    # rows are in store order, a stable sort by distance keeps it for ties
+    for i in np.argsort(distances, kind="stable"):
+        if distances[i] == 0 or distances[i] > max_distance:
+            continue
+        if candidates[i] not in suggestions:
+            suggestions.append(candidates[i])
+        if len(suggestions) == count:
+            break
+    return suggestions
@@ -1,18 +1,160 @@
-with open("word_list.txt", "r") as word_list:
-    word_list.readline()
-
-    words_only = []
-    for word in word_list:
-        parts = word.strip().split(".")
-        words_only.append(parts[1])  
-    
-    clean_list = []
-    seen = set()
-    for word in words_only:
-        if word not in seen:
-            clean_list.append(word)
-            seen.add(word)
-
-with open("cleaned_word_list.txt", "w") as cleaned_word_list:
-    for word in clean_list:
-        cleaned_word_list.write(f"{word}\n")
+"""
+Word list ingestion for Semantic Search Party
+
+Turns word_list.txt (lines like "12.word") into cleaned_word_list.txt, the game's vocabulary, and
+looks up every word's frequency once so get_freq doesn't have to.
+
+The source is read in chunks of CHUNK_LINES lines, so a list with millions of lines never has to fit
+in memory. Each chunk is:
+    - normalized: whitespace (including page breaks) and the "12." numbering are removed;
+      case is kept because spaCy's vectors are case-sensitive ("Christmas", "French")
+    - deduplicated against every word seen so far; the seen-set is a sorted array of 64-bit
+      hashes (8 bytes per distinct word instead of a Python string in a set)
+    - looked up in the frequency cache (freq_cache.py), which asks wordfreq in one batch for the
+      words it doesn't have yet, so a --full rebuild of a list that was seen before never loads wordfreq
+    - appended to the outputs
+
+Outputs are columns that line up row for row:
+    cleaned_word_list.txt       word (one per line, like before)
+    word_columns/freq.f64       frequency (float64)
+    word_columns/length.u16     length (uint16)
+word_columns/state.json remembers how far into the source the last run got, so running this again
+after lines were appended to word_list.txt only processes the new lines. If the source was changed
+anywhere else, or --full is given, everything is rebuilt.
+
+As before, the first line of word_list.txt is skipped.
+
+Run it with: python updating_list.py [--full]
+"""
+
+
+import hashlib
+import json
+import os
+import sys
+from itertools import islice
+import numpy as np
+from freq_cache import word_hashes, open_cache, cached_freqs, save_cache
+
+SOURCE_FILE = "word_list.txt"
+CLEAN_FILE = "cleaned_word_list.txt"
+COLUMNS_DIR = "word_columns"
+CHUNK_LINES = 50000
+HEAD_BYTES = 4096       # the start of the source is hashed to notice when it was rewritten rather than appended to
+
+
+def column_paths(columns_dir):
+    return {
+        "freq": os.path.join(columns_dir, "freq.f64"),
+        "length": os.path.join(columns_dir, "length.u16"),
+        "seen": os.path.join(columns_dir, "seen.u64"),
+        "state": os.path.join(columns_dir, "state.json"),
+    }
+
+# the word on a source line ("12.word" -> "word"), or None for a line without one
+def word_of(line):
+    line = line.strip()
+    number, dot, word = line.partition(".")
+    if dot and number.isdigit():
+        line = word.strip()
+    return line or None
+
+def source_head(source):
+    with open(source, "rb") as source_file:
+        return hashlib.sha256(source_file.read(HEAD_BYTES)).hexdigest()
+
+# the last run's state, or None if there isn't one or the source was changed somewhere other than its end
+def load_state(paths, source):
+    if not os.path.exists(paths["state"]):
+        return None
+    with open(paths["state"], "r") as state_file:
+        state = json.load(state_file)
+    if os.path.getsize(source) < state["source_bytes"] or source_head(source) != state["source_head"]:
+        return None
+    return state
+
+# cuts every output back to the size the last run left it at (undoes a run that stopped halfway)
+def truncate_outputs(outputs, sizes):
+    for name, path in outputs.items():
+        with open(path, "ab") as output:
+            output.truncate(sizes.get(name, 0))
+
+# keeps the words in a chunk that are new: not seen in earlier chunks and not repeated earlier in this chunk
+def new_words(words, seen):
+    hashes = word_hashes(words)
+    unique, first = np.unique(hashes, return_index=True)
+    pos = np.minimum(np.searchsorted(seen, unique), max(len(seen) - 1, 0))
+    fresh = np.ones(len(unique), dtype=bool) if len(seen) == 0 else seen[pos] != unique
+    keep = np.sort(first[fresh])
+    # both parts are already sorted, so a stable sort just merges them
+    seen = np.concatenate((seen, unique[fresh]))
+    seen.sort(kind="stable")
+    return [words[i] for i in keep], seen
+
+# runs the pipeline, returns how many lines were read and how many words were added
+def ingest(source=SOURCE_FILE, clean_path=CLEAN_FILE, columns_dir=COLUMNS_DIR, full=False):
+    os.makedirs(columns_dir, exist_ok=True)
+    paths = column_paths(columns_dir)
+    outputs = {"clean": clean_path, "freq": paths["freq"], "length": paths["length"]}
+
+    state = None if full else load_state(paths, source)
+    if state is None:
+        state = {"source_bytes": 0, "source_head": source_head(source), "rows": 0, "sizes": {}}
+        seen = np.zeros(0, dtype=np.uint64)
+    else:
+        seen = np.fromfile(paths["seen"], dtype=np.uint64)
+    truncate_outputs(outputs, state["sizes"])
+
+    cache = open_cache()
+    lines_read = 0
+    words_added = 0
+    with open(source, "rb") as source_file, open(clean_path, "a", encoding="utf-8") as clean_file, \
+            open(paths["freq"], "ab") as freq_file, open(paths["length"], "ab") as length_file:
+        source_file.seek(state["source_bytes"])
+        if state["source_bytes"] == 0:
+            source_file.readline()
+
+        while True:
+            lines = list(islice(source_file, CHUNK_LINES))
+            if not lines:
+                break
+            lines_read += len(lines)
+            words = [word for word in (word_of(line.decode("utf-8", errors="replace")) for line in lines) if word]
+            words, seen = new_words(words, seen)
+            if not words:
+                continue
+
+            clean_file.writelines(f"{word}\n" for word in words)
+            cached_freqs(cache, words).tofile(freq_file)
+            np.array([len(word) for word in words], dtype=np.uint16).tofile(length_file)
+            words_added += len(words)
+
+        state["source_bytes"] = source_file.tell()
+
+    save_cache(cache)
+    seen.tofile(paths["seen"])
+    state["rows"] += words_added
+    state["sizes"] = {name: os.path.getsize(path) for name, path in outputs.items()}
+    with open(paths["state"] + ".tmp", "w") as state_file:
+        json.dump(state, state_file, indent=2)
+    os.replace(paths["state"] + ".tmp", paths["state"])
+    return {"lines": lines_read, "added": words_added, "rows": state["rows"]}
+
+# the frequency column, or None if it is missing or doesn't match the cleaned word list any more
+def load_freqs(clean_path=CLEAN_FILE, columns_dir=COLUMNS_DIR):
+    paths = column_paths(columns_dir)
+    if not os.path.exists(paths["state"]) or not os.path.exists(clean_path):
+        return None
+    with open(paths["state"], "r") as state_file:
+        state = json.load(state_file)
+    if state["sizes"].get("clean") != os.path.getsize(clean_path):
+        return None
+    freqs = np.fromfile(paths["freq"], dtype=np.float64)
+    if len(freqs) != state["rows"]:
+        return None
+    return freqs
+
+
+if __name__ == "__main__":
+    result = ingest(full="--full" in sys.argv[1:])
+    print(f"Read {result['lines']} new lines, added {result['added']} words ({result['rows']} in {CLEAN_FILE})")